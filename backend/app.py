@@ -11,14 +11,26 @@ import uuid
 import time
 import logging
 import threading
-import base64
-from datetime import datetime
+import json
+from datetime import datetime, timezone
 
 from flask import Flask, request, jsonify, send_file, render_template, Response
+from werkzeug.http import is_resource_modified
 from dotenv import load_dotenv
 
-from utils.tts import synthesize_speech, get_available_voices, VOICES, GTTS_VOICES, get_gtts_voice
-from utils.video import create_reel, create_thumbnail, get_transition_list
+from utils.tts import get_available_voices, VOICES, GTTS_VOICES, get_gtts_voice
+from utils.video import get_transition_list
+from utils.scheduler import RenderScheduler, QueueFullError
+from utils.jobstore import create_job_store, BUSY_STATUSES
+from utils.jobqueue import create_job_queue
+from utils.pipeline import run_render_job
+from utils.outputs import OutputIndex, JOB_TTL_SECONDS
+from utils.ratelimit import create_rate_limiter
+from utils.blobs import BlobStore
+from utils.music import get_music_library
+from utils.images import prepare_for_model
+from utils.ai_script import model_health
+from utils.ranges import MAX_BYTE_RANGES, resolve_byte_ranges, if_range_matches, read_range
 
 load_dotenv(override=True)
 
@@ -29,7 +41,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50 MB max upload
 
-OUTPUT_FOLDER = os.path.join(BASE_DIR, "output")
+OUTPUT_FOLDER = os.getenv("VIDGO_OUTPUT_DIR") or os.path.join(BASE_DIR, "output")
 MUSIC_FOLDER = os.path.join(BASE_DIR, "static", "music")
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 os.makedirs(MUSIC_FOLDER, exist_ok=True)
@@ -43,10 +55,39 @@ logger = logging.getLogger(__name__)
 _voice_cache: dict = {"key": None, "voices": None, "timestamp": 0}
 VOICE_CACHE_TTL = 300  # 5 minutes
 
-# ── Job Tracking (in-memory) ───────────────────────────────
-# Each job: { status, progress, message, result, error, created_at }
-jobs: dict = {}
-jobs_lock = threading.Lock()
+# ── Job Tracking ───────────────────────────────────────────
+# Each job: { status, progress, message, result, error, created_at, version }
+# In-memory by default; JOB_STORE=sqlite shares state between web processes.
+job_store = create_job_store()
+# Per-job cancel events for renders running in this process
+job_cancel_events: dict = {}
+SSE_HEARTBEAT_SECONDS = 15
+
+# ── Render Scheduler ───────────────────────────────────────
+# Bounded worker pool; excess jobs wait in a FIFO queue, overflow gets 503.
+render_scheduler = RenderScheduler()
+
+# RENDER_BACKEND=queue hands jobs to standalone workers (python -m worker)
+# through a durable queue instead of rendering in this process.
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "thread")
+job_queue = create_job_queue() if RENDER_BACKEND == "queue" else None
+if job_queue is not None and not job_store.shared:
+    logger.warning("RENDER_BACKEND=queue needs a shared job store (JOB_STORE=sqlite) to report progress")
+
+# ── Output Storage ─────────────────────────────────────────
+# Expiry heap + per-job sizes for the output folder; cleanup pops expired
+# jobs instead of scanning the folder, and evicts least recently accessed
+# outputs when OUTPUT_QUOTA_MB or DISK_HIGH_WATER_PERCENT is exceeded.
+# Uploads are stored once by content hash and hardlinked into job dirs
+blob_store = BlobStore()
+blob_store.collect()
+output_index = OutputIndex(OUTPUT_FOLDER, remove_dir=blob_store.remove_job_dir)
+output_index.rebuild_from_disk()
+CLEANUP_INTERVAL_SECONDS = int(os.getenv("CLEANUP_INTERVAL_SECONDS", "60"))
+# Full blob sweep: picks up blobs no manifest releases (jobs that failed before
+# writing one, or uploads copied because hardlinks weren't possible)
+BLOB_COLLECT_INTERVAL_SECONDS = int(os.getenv("BLOB_COLLECT_INTERVAL_SECONDS", "3600"))
+ADMIN_TOKEN = os.getenv("VIDGO_ADMIN_TOKEN", "")
 
 ASPECT_RATIOS = {
     "9:16": (1080, 1920),
@@ -62,6 +103,9 @@ MUSIC_TRACKS = [
     {"id": "inspiring", "name": "Inspiring Journey", "file": "inspiring.mp3", "category": "Inspirational", "duration": "30s"},
     {"id": "lofi", "name": "Lo-Fi Beats", "file": "lofi.mp3", "category": "Chill", "duration": "30s"},
 ]
+# Durations, loudness and normalized PCM for the files above, indexed in the
+# background at startup and whenever the folder changes
+music_library = get_music_library(MUSIC_FOLDER, watch=True)
 
 
 # ── Helpers ─────────────────────────────────────────────────
@@ -101,53 +145,158 @@ def get_cached_voices(api_key: str) -> dict:
 
 
 def update_job(job_id: str, **kwargs):
-    """Thread-safe job state update."""
-    with jobs_lock:
-        if job_id in jobs:
-            jobs[job_id].update(kwargs)
+    """Thread-safe job state update; wakes any event-stream subscribers."""
+    job_store.update(job_id, **kwargs)
 
 
-def cleanup_old_jobs(max_age_seconds=3600):
-    """Remove generated jobs older than max_age_seconds (default 1 hour)."""
-    import shutil
+def job_payload(job_id: str, job: dict) -> dict:
+    """Public view of a job, shared by the polling and event-stream routes."""
+    payload = {
+        "status": job["status"],
+        "progress": job["progress"],
+        "message": job["message"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+    if job.get("eta_seconds") is not None or job.get("encode_speed"):
+        payload["eta_seconds"] = job.get("eta_seconds")
+        payload["encode_speed"] = job.get("encode_speed")
+    if job["status"] == "queued":
+        if job_queue is not None:
+            position, wait = job_queue.position(job_id), None
+        else:
+            position = render_scheduler.position(job_id)
+            wait = render_scheduler.estimated_wait(job_id)
+        payload["queue_position"] = position
+        payload["estimated_wait_seconds"] = round(wait) if wait is not None else None
+        if position:
+            payload["message"] = f"Queued: position {position}"
+    return payload
+
+
+def job_is_busy(job_id: str) -> bool:
+    """
+    True while a render or export is still writing into the job's directory.
+
+    The job store record is only one signal (it may already be gone), so the
+    render scheduler, durable queue and export scheduler are asked as well.
+    """
+    job = job_store.get(job_id)
+    if job is not None and job["status"] in BUSY_STATUSES:
+        return True
+    if render_scheduler.position(job_id) is not None:
+        return True
+    if job_queue is not None and job_queue.position(job_id) is not None:
+        return True
+    if any(export_scheduler.position(f"{job_id}:{p}") is not None for p in PLATFORM_SETTINGS):
+        return True
+    with exports_lock:
+        return any(
+            exports.get((job_id, p), {}).get("status") in ("queued", "processing")
+            for p in PLATFORM_SETTINGS
+        )
+
+
+def forget_job(job_id: str):
+    """Drop per-process state kept for a job whose files are gone."""
+    with exports_lock:
+        for platform in PLATFORM_SETTINGS:
+            exports.pop((job_id, platform), None)
+    job_cancel_events.pop(job_id, None)
+
+
+def cleanup_old_jobs(max_age_seconds=JOB_TTL_SECONDS):
+    """Remove expired jobs (default 1 hour) and enforce the output disk quota."""
     now = time.time()
-    cleaned: int = 0
     try:
-        for job_id in os.listdir(OUTPUT_FOLDER):
-            job_path = os.path.join(OUTPUT_FOLDER, job_id)
-            if os.path.isdir(job_path):
-                age = now - os.path.getmtime(job_path)
-                if age > max_age_seconds:
-                    shutil.rmtree(job_path, ignore_errors=True)
-                    cleaned += 1
-        # Also clean up old job entries from memory
-        with jobs_lock:
-            stale = [jid for jid, j in jobs.items() if now - j.get("created_at", 0) > max_age_seconds]
-            for jid in stale:
-                del jobs[jid]
-        if cleaned:
-            logger.info(f"Cleaned up {cleaned} old job(s) and {len(stale)} memory entries")
+        output_index.measure(is_finished=lambda jid: not job_is_busy(jid))
+
+        cleaned: int = 0
+        for job_id in output_index.pop_expired(now):
+            if job_is_busy(job_id):
+                # Still rendering (e.g. after a long queue wait): check again later
+                output_index.add(job_id, now)
+                continue
+            blob_store.remove_job_dir(os.path.join(OUTPUT_FOLDER, job_id))
+            forget_job(job_id)
+            cleaned += 1
+
+        evicted = output_index.pop_over_quota(is_busy=job_is_busy)
+        for job_id in evicted:
+            forget_job(job_id)
+
+        # Also clean up old job entries from the job store
+        stale = job_store.delete_older_than(now - max_age_seconds)
+        for jid in stale:
+            forget_job(jid)
+        if cleaned or evicted or stale:
+            logger.info(f"Cleaned up {cleaned} expired job(s), evicted {len(evicted)} for disk space, "
+                        f"removed {len(stale)} job store entries")
     except Exception as e:
         logger.error(f"Cleanup error: {e}")
 
 
-def stream_video(video_path: str):
-    """Generator to stream video in chunks for memory efficiency."""
-    CHUNK_SIZE = 1024 * 1024  # 1 MB chunks
-    with open(video_path, "rb") as f:
-        while True:
-            chunk = f.read(CHUNK_SIZE)
-            if not chunk:
-                break
-            yield chunk
+def video_etag(video_path: str) -> str:
+    """Strong validator for a rendered file; changes whenever the file is rewritten."""
+    st = os.stat(video_path)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def single_range_response(video_path: str, start: int, stop: int, file_size: int, etag: str) -> Response:
+    """Build a plain 206 response for what a multi-range request merged down to."""
+    def generate():
+        with open(video_path, "rb") as f:
+            yield from read_range(f, start, stop)
+
+    response = Response(generate(), status=206, mimetype="video/mp4")
+    response.headers["Content-Length"] = str(stop - start)
+    response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{file_size}"
+    response.headers["Accept-Ranges"] = "bytes"
+    response.set_etag(etag)
+    return response
+
+
+def multirange_response(video_path: str, ranges: list, file_size: int, etag: str) -> Response:
+    """Build a 206 multipart/byteranges response for a multi-range request."""
+    boundary = uuid.uuid4().hex
+    heads = [
+        (
+            f"--{boundary}\r\nContent-Type: video/mp4\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{file_size}\r\n\r\n"
+        ).encode("ascii")
+        for start, stop in ranges
+    ]
+    tail = f"--{boundary}--\r\n".encode("ascii")
+    length = sum(len(h) + (stop - start) + 2 for h, (start, stop) in zip(heads, ranges)) + len(tail)
+
+    def generate():
+        with open(video_path, "rb") as f:
+            for head, (start, stop) in zip(heads, ranges):
+                yield head
+                yield from read_range(f, start, stop)
+                yield b"\r\n"
+        yield tail
+
+    response = Response(generate(), status=206, mimetype=f"multipart/byteranges; boundary={boundary}")
+    response.headers["Content-Length"] = str(length)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.set_etag(etag)
+    return response
 
 
 # ── Periodic Cleanup (background thread) ───────────────────
 def _start_cleanup_scheduler():
     def run():
+        last_collect = time.time()
         while True:
-            time.sleep(1800)  # Every 30 minutes
+            time.sleep(CLEANUP_INTERVAL_SECONDS)  # Cheap: only touches expired jobs
             cleanup_old_jobs()
+            if time.time() - last_collect >= BLOB_COLLECT_INTERVAL_SECONDS:
+                last_collect = time.time()
+                try:
+                    blob_store.collect()
+                except Exception as e:
+                    logger.error(f"Blob collection error: {e}")
 
     t = threading.Thread(target=run, daemon=True)
     t.start()
@@ -156,19 +305,41 @@ def _start_cleanup_scheduler():
 _start_cleanup_scheduler()
 
 
-# ── Rate limiter (simple in-memory) ────────────────────────
-_rate_limits: dict[str, float] = {}
-RATE_LIMIT_SECONDS = 10  # Min seconds between generate requests per IP
+# ── Rate limiter (token bucket) ────────────────────────────
+# Per-IP buckets of RATE_LIMIT_BURST tokens refilled at RATE_LIMIT_REFILL_PER_SEC.
+# RATE_LIMIT_STORE=sqlite|redis shares them between web processes.
+rate_limiter = create_rate_limiter()
 
 
-def check_rate_limit(ip: str) -> bool:
-    """Returns True if request is allowed, False if rate-limited."""
-    now = time.time()
-    last = _rate_limits.get(ip, 0)
-    if now - last < RATE_LIMIT_SECONDS:
-        return False
-    _rate_limits[ip] = now
-    return True
+def generate_cost(num_images: int, script_chars: int) -> float:
+    """Tokens for a render: grows with the images to encode and narration to synthesize."""
+    return 1 + num_images / 4 + script_chars / 1000
+
+
+def script_cost(num_images: int) -> float:
+    """Tokens for an AI script request (at most 5 images are sent)."""
+    return 0.5 + min(num_images, 5) / 4
+
+
+EXPORT_COST = 1.0
+
+
+def check_rate_limit(ip: str, cost: float = 1.0):
+    """Returns None if the request is allowed, else a 429 response."""
+    allowed, retry_after = rate_limiter.take(ip, cost)
+    if allowed:
+        return None
+    response = jsonify({"error": f"Too many requests. Please wait {retry_after}s and try again.", "retry_after": retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def _queue_full_response(retry_after: int):
+    response = jsonify({"error": "Server is busy rendering other reels. Please try again shortly.", "retry_after": retry_after})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(retry_after)
+    return response
 
 
 # ═══════════════════════════════════════════════════════════
@@ -187,9 +358,21 @@ def health():
         "status": "healthy",
         "service": "Vidgo.AI",
         "timestamp": datetime.now().isoformat(),
+        "render_queue": render_scheduler.stats(),
+        "storage": output_index.stats(),
+        "script_models": model_health.snapshot(),
     })
 
 
+@app.route("/api/storage")
+def storage():
+    """Output folder usage with the largest jobs, for operators (needs VIDGO_ADMIN_TOKEN)."""
+    if not ADMIN_TOKEN or request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return jsonify({"error": "Forbidden"}), 403
+    top = min(request.args.get("top", 50, type=int), 1000)
+    return jsonify(output_index.stats(top=top))
+
+
 @app.route("/api/voices", methods=["POST"])
 def voices():
     data = request.get_json(silent=True) or {}
@@ -240,10 +423,6 @@ def voice_preview():
 @app.route("/api/generate", methods=["POST"])
 def generate():
     try:
-        # Rate limiting
-        if not check_rate_limit(request.remote_addr):
-            return jsonify({"error": "Please wait a few seconds before generating again."}), 429
-
         if "photos" not in request.files:
             return jsonify({"error": "No photos uploaded"}), 400
 
@@ -255,6 +434,20 @@ def generate():
         if len(valid_files) > 20:
             return jsonify({"error": "Maximum 20 images allowed"}), 400
 
+        # Rate limiting, weighted by how much work the render will be
+        limited = check_rate_limit(
+            request.remote_addr, generate_cost(len(valid_files), len(request.form.get("script", "").strip())),
+        )
+        if limited:
+            return limited
+
+        # Admission control: refuse early rather than saving uploads we can't render
+        if job_queue is not None:
+            if job_queue.depth() >= render_scheduler.max_queue:
+                return _queue_full_response(render_scheduler.retry_after())
+        elif render_scheduler.is_full():
+            return _queue_full_response(render_scheduler.retry_after())
+
         script = request.form.get("script", "").strip()
         voice = request.form.get("voice", "rachel")
         transition = request.form.get("transition", "fade")
@@ -270,6 +463,12 @@ def generate():
         music_volume = float(request.form.get("music_volume", "0.15"))
         transition_duration = float(request.form.get("transition_duration", "0.5"))
         speech_speed = request.form.get("speech_speed", "normal")
+        # Opt-in: render platform variants alongside the reel (list field or comma-separated)
+        platforms = [p.strip() for raw in request.form.getlist("platforms") for p in raw.split(",") if p.strip()]
+        unknown = [p for p in platforms if p not in PLATFORM_SETTINGS]
+        if unknown:
+            return jsonify({"error": f"Unknown platform(s): {', '.join(unknown)}. Supported: {', '.join(PLATFORM_SETTINGS.keys())}"}), 400
+        platforms = list(dict.fromkeys(platforms))
 
         if not script:
             return jsonify({"error": "Please provide a narration script"}), 400
@@ -279,104 +478,77 @@ def generate():
         resolution = ASPECT_RATIOS.get(aspect_ratio, (1080, 1920))
         duration_per_image = float(custom_duration) if custom_duration else None
 
+        # Make room before writing, in case a burst filled the disk since the last sweep
+        for evicted_id in output_index.pop_over_quota(is_busy=job_is_busy):
+            forget_job(evicted_id)
+
         job_id = generate_job_id()
         job_dir = os.path.join(OUTPUT_FOLDER, job_id)
         os.makedirs(job_dir, exist_ok=True)
+        output_index.add(job_id, time.time())
 
         logger.info(f"Job {job_id}: {len(valid_files)} images, voice={voice}, transition={transition}, ratio={aspect_ratio}")
 
-        # Save uploaded images synchronously (fast)
+        # Save uploaded images synchronously (fast); repeated uploads share one blob
         image_paths = []
+        image_hashes = []
         for i, file in enumerate(valid_files):
             ext = file.filename.rsplit(".", 1)[1].lower()
             filepath = os.path.join(job_dir, f"img_{i:03d}.{ext}")
-            file.save(filepath)
+            image_hashes.append(blob_store.ingest(file.stream, filepath))
             image_paths.append(filepath)
+        blob_store.write_manifest(job_dir, image_hashes)
 
         # Initialize job tracking
-        with jobs_lock:
-            jobs[job_id] = {
-                "status": "processing",
-                "progress": 10,
-                "message": "Uploading images...",
-                "result": None,
-                "error": None,
-                "created_at": time.time(),
-            }
-
-        # Run heavy processing in background thread
-        def process_job():
-            try:
-                update_job(job_id, progress=20, message="Generating narration...")
-
-                # Synthesize narration
-                audio_path = os.path.join(job_dir, "narration.mp3")
-                voice_id = VOICES.get(voice, voice)
-                synthesize_speech(text=script, output_path=audio_path, api_key=api_key if api_key else None, voice_id=voice_id, speech_speed=speech_speed)
-
-                update_job(job_id, progress=40, message="Mixing audio...")
-
-                # Mix with background music if selected
-                final_audio = audio_path
-                if music_id:
-                    music_track = next((t for t in MUSIC_TRACKS if t["id"] == music_id), None)
-                    if music_track:
-                        music_path = os.path.join(MUSIC_FOLDER, music_track["file"])
-                        if os.path.exists(music_path):
-                            from utils.audio import mix_audio
-                            mixed_path = os.path.join(job_dir, "mixed_audio.mp3")
-                            mix_audio(audio_path, music_path, mixed_path, music_volume=music_volume)
-                            final_audio = mixed_path
-
-                update_job(job_id, progress=55, message="Creating video with transitions...")
-
-                # Generate video
-                output_video = os.path.join(job_dir, "reel.mp4")
-                create_reel(
-                    image_paths=image_paths,
-                    audio_path=final_audio,
-                    output_path=output_video,
-                    transition=transition,
-                    transition_duration=transition_duration,
-                    resolution=resolution,
-                    duration_per_image=duration_per_image,
-                    title_text=title_text,
-                    title_position=title_position,
-                )
-
-                update_job(job_id, progress=85, message="Generating thumbnail...")
-
-                # Generate thumbnail
-                thumbnail_path = os.path.join(job_dir, "thumbnail.jpg")
-                create_thumbnail(output_video, thumbnail_path)
-
-                video_size = os.path.getsize(output_video) / (1024 * 1024)
-                tts_used = "ElevenLabs" if api_key else "Google TTS"
-
-                update_job(
-                    job_id,
-                    status="done",
-                    progress=100,
-                    message="Reel generated successfully!",
-                    result={
-                        "job_id": job_id,
-                        "video_url": f"/api/stream/{job_id}",
-                        "download_url": f"/api/download/{job_id}",
-                        "thumbnail_url": f"/api/thumbnail/{job_id}",
-                        "video_size_mb": round(video_size, 2),
-                        "num_images": len(image_paths),
-                        "tts_engine": tts_used,
-                    },
-                )
-                logger.info(f"Job {job_id}: Done ({video_size:.1f} MB)")
-
-            except Exception as e:
-                logger.error(f"Job {job_id} error: {e}", exc_info=True)
-                update_job(job_id, status="error", progress=0, message=str(e), error=str(e))
-
-        threading.Thread(target=process_job, daemon=True).start()
-
-        return jsonify({"success": True, "job_id": job_id})
+        job_store.create(job_id, {
+            "status": "queued",
+            "progress": 10,
+            "message": "Waiting for a render slot...",
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+        })
+
+        # Everything the render needs, in a form a separate worker can use
+        music_track = next((t for t in MUSIC_TRACKS if t["id"] == music_id), None) if music_id else None
+        params = {
+            "images": [os.path.basename(p) for p in image_paths],
+            "image_hashes": image_hashes,
+            "script": script,
+            "voice_id": VOICES.get(voice, voice),
+            "speech_speed": speech_speed,
+            "music_file": music_track["file"] if music_track else None,
+            "music_volume": music_volume,
+            "transition": transition,
+            "transition_duration": transition_duration,
+            "resolution": list(resolution),
+            "duration_per_image": duration_per_image,
+            "title_text": title_text,
+            "title_position": title_position,
+            "platforms": {p: PLATFORM_SETTINGS[p] for p in platforms},
+        }
+
+        if job_queue is not None:
+            # The user's key goes beside the durable payload and is deleted on claim;
+            # a server-side key is read from the worker's own environment
+            secrets = {"api_key": user_api_key} if user_api_key else None
+            position = job_queue.enqueue(job_id, params, secrets=secrets)
+            return jsonify({"success": True, "job_id": job_id, "queue_position": position})
+
+        params["api_key"] = api_key
+        cancel_event = job_cancel_events[job_id] = threading.Event()
+        try:
+            position = render_scheduler.submit(
+                job_id, run_render_job, job_store, job_id, params, OUTPUT_FOLDER, MUSIC_FOLDER, cancel_event,
+            )
+        except QueueFullError as e:
+            # Lost the race for the last slot: undo the job and reject it
+            job_store.delete(job_id)
+            job_cancel_events.pop(job_id, None)
+            blob_store.remove_job_dir(job_dir)
+            return _queue_full_response(e.retry_after)
+
+        return jsonify({"success": True, "job_id": job_id, "queue_position": position})
 
     except Exception as e:
         logger.error(f"Generation error: {e}", exc_info=True)
@@ -388,17 +560,86 @@ def job_status(job_id):
     """Poll for job progress."""
     if not is_valid_job_id(job_id):
         return jsonify({"error": "Invalid job ID"}), 400
-    with jobs_lock:
-        job = jobs.get(job_id)
+    job = job_store.get(job_id)
     if not job:
         return jsonify({"error": "Job not found"}), 404
-    return jsonify({
-        "status": job["status"],
-        "progress": job["progress"],
-        "message": job["message"],
-        "result": job["result"],
-        "error": job["error"],
-    })
+    return jsonify(job_payload(job_id, job))
+
+
+@app.route("/api/events/<job_id>")
+def job_events(job_id):
+    """Server-Sent Events stream of job progress, pushed on every update."""
+    if not is_valid_job_id(job_id):
+        return jsonify({"error": "Invalid job ID"}), 400
+    if job_store.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    try:
+        last_version = int(request.headers.get("Last-Event-ID", "-1"))
+    except ValueError:
+        last_version = -1
+
+    def generate():
+        seen_version = last_version
+        last_sent = None
+        yield "retry: 3000\n\n"
+        while True:
+            snapshot = job_store.wait_for_change(job_id, seen_version, SSE_HEARTBEAT_SECONDS)
+
+            if snapshot is None:
+                yield "event: gone\ndata: {}\n\n"
+                return
+
+            payload = job_payload(job_id, snapshot)
+            # Queue position can change without an update, so compare payloads
+            if payload != last_sent:
+                seen_version = snapshot["version"]
+                last_sent = payload
+                yield f"id: {seen_version}\ndata: {json.dumps(payload)}\n\n"
+            else:
+                yield ": heartbeat\n\n"
+
+            if snapshot["status"] in ("done", "error", "cancelled"):
+                return
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/cancel/<job_id>", methods=["POST"])
+def cancel_job(job_id):
+    """Stop a queued or running render (e.g. after the user has seen the preview)."""
+    if not is_valid_job_id(job_id):
+        return jsonify({"error": "Invalid job ID"}), 400
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] not in ("queued", "processing"):
+        return jsonify({"error": f"Job is already {job['status']}"}), 409
+
+    # The render may live in another process; it picks the flag up from the store
+    update_job(job_id, cancel_requested=True)
+    event = job_cancel_events.get(job_id)
+    if event:
+        event.set()
+    dropped = job_queue.cancel(job_id) if job_queue is not None else render_scheduler.cancel(job_id)
+    if dropped:
+        update_job(job_id, status="cancelled", message="Render cancelled")
+    return jsonify({"success": True, "job_id": job_id})
+
+
+@app.route("/api/preview/<job_id>")
+def preview(job_id):
+    if not is_valid_job_id(job_id):
+        return jsonify({"error": "Invalid job ID"}), 400
+    preview_path = os.path.join(OUTPUT_FOLDER, job_id, "preview.mp4")
+    if not os.path.exists(preview_path):
+        return jsonify({"error": "Preview not found"}), 404
+    output_index.touch(job_id, time.time())
+    return send_file(preview_path, mimetype="video/mp4", conditional=True, etag=video_etag(preview_path), max_age=3600)
 
 
 @app.route("/api/download/<job_id>")
@@ -408,6 +649,7 @@ def download(job_id):
     video_path = os.path.join(OUTPUT_FOLDER, job_id, "reel.mp4")
     if not os.path.exists(video_path):
         return jsonify({"error": "Video not found"}), 404
+    output_index.touch(job_id, time.time())
     return send_file(video_path, mimetype="video/mp4", as_attachment=True, download_name=f"vidgo_reel_{job_id}.mp4")
 
 
@@ -418,17 +660,39 @@ def stream(job_id):
     video_path = os.path.join(OUTPUT_FOLDER, job_id, "reel.mp4")
     if not os.path.exists(video_path):
         return jsonify({"error": "Video not found"}), 404
+    output_index.touch(job_id, time.time())
 
-    file_size = os.path.getsize(video_path)
-    return Response(
-        stream_video(video_path),
-        mimetype="video/mp4",
-        headers={
-            "Content-Length": str(file_size),
-            "Accept-Ranges": "bytes",
-            "Cache-Control": "public, max-age=3600",
-        },
-    )
+    etag = video_etag(video_path)
+    last_modified = datetime.fromtimestamp(int(os.path.getmtime(video_path)), timezone.utc)
+
+    # Conditionals are evaluated before looking at the Range header, so a
+    # cached copy gets its 304 however many ranges were asked for
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    rng = request.range
+    if rng and not if_range_matches(request.if_range, etag, last_modified):
+        # The client's partial copy is stale: send the whole file
+        return send_file(video_path, mimetype="video/mp4", conditional=False, etag=etag,
+                         last_modified=last_modified, max_age=3600)
+
+    # Multi-range requests aren't handled by send_file; single ranges are, and
+    # it serves the body via wsgi.file_wrapper (sendfile) where the server
+    # supports it.
+    if rng and len(rng.ranges) > 1:
+        file_size = os.path.getsize(video_path)
+        # Capping the raw count stops "bytes=0-,0-,0-,..." from streaming the file N times
+        ranges = resolve_byte_ranges(rng.ranges, file_size) if len(rng.ranges) <= MAX_BYTE_RANGES else []
+        if not ranges:
+            return Response(status=416, headers={"Content-Range": f"bytes */{file_size}"})
+        if len(ranges) == 1:
+            return single_range_response(video_path, *ranges[0], file_size, etag)
+        return multirange_response(video_path, ranges, file_size, etag)
+
+    return send_file(video_path, mimetype="video/mp4", conditional=True, etag=etag,
+                     last_modified=last_modified, max_age=3600)
 
 
 @app.route("/api/thumbnail/<job_id>")
@@ -438,6 +702,7 @@ def thumbnail(job_id):
     thumb_path = os.path.join(OUTPUT_FOLDER, job_id, "thumbnail.jpg")
     if not os.path.exists(thumb_path):
         return jsonify({"error": "Thumbnail not found"}), 404
+    output_index.touch(job_id, time.time())
     return send_file(thumb_path, mimetype="image/jpeg")
 
 
@@ -458,18 +723,23 @@ def generate_script():
         if not valid_files:
             return jsonify({"error": "No valid images found"}), 400
 
+        limited = check_rate_limit(request.remote_addr, script_cost(len(valid_files)))
+        if limited:
+            return limited
+
         tone = request.form.get("tone", "professional")
         custom_prompt = request.form.get("custom_prompt", "").strip()
 
-        # Convert images to base64 for the AI
-        image_data = []
+        # Raw bytes, shrunk to the model's image budget in parallel
+        uploads = []
         for f in valid_files[:5]:  # Limit to 5 images for API efficiency
             f.seek(0)
-            data = base64.b64encode(f.read()).decode("utf-8")
             mime = f"image/{f.filename.rsplit('.', 1)[1].lower()}"
             if mime == "image/jpg":
                 mime = "image/jpeg"
-            image_data.append({"data": data, "mime_type": mime})
+            uploads.append((f.read(), mime))
+        image_data = prepare_for_model(uploads)
+        del uploads  # drop the full-size originals before the (slow) model call
 
         from utils.ai_script import generate_narration_script
         user_gemini_key = request.form.get("gemini_api_key", "").strip()
@@ -494,15 +764,23 @@ def generate_script():
 
 @app.route("/api/music")
 def music_list():
-    """Return list of available background music tracks."""
+    """Return list of available background music tracks, with measured details once indexed."""
+    indexed = music_library.tracks()
     available = []
     for track in MUSIC_TRACKS:
-        music_path = os.path.join(MUSIC_FOLDER, track["file"])
-        available.append({
+        entry = indexed.get(track["file"])
+        item = {
             **track,
-            "available": os.path.exists(music_path),
+            # Unindexed tracks are still usable: the pipeline mixes the raw file
+            "available": entry is not None or os.path.exists(os.path.join(MUSIC_FOLDER, track["file"])),
             "preview_url": f"/static/music/{track['file']}",
-        })
+        }
+        if entry:
+            item["duration"] = f"{round(entry['duration'])}s"
+            item["duration_seconds"] = entry["duration"]
+            item["loudness_lufs"] = entry["loudness_lufs"]
+            item["sample_rate"] = entry["sample_rate"]
+        available.append(item)
     return jsonify(available)
 
 
@@ -517,47 +795,145 @@ PLATFORM_SETTINGS = {
 }
 
 
-@app.route("/api/export/<job_id>/<platform>")
-def export_for_platform(job_id, platform):
-    """Re-encode video optimized for a specific social media platform."""
+# Export jobs, keyed by (job_id, platform). Only one export per key runs at a
+# time; concurrent requests for the same key share it.
+exports: dict = {}
+exports_lock = threading.Lock()
+export_scheduler = RenderScheduler(workers=max(1, render_scheduler.workers // 2), max_queue=render_scheduler.max_queue)
+
+
+def start_export(job_id: str, platform: str) -> dict:
+    """Start (or join) the export for (job_id, platform) and return its state."""
+    key = (job_id, platform)
+    with exports_lock:
+        state = exports.get(key)
+        if state and state["status"] in ("queued", "processing"):
+            return dict(state)
+        state = {"status": "queued", "progress": 0, "error": None}
+        exports[key] = state
+    output_index.mark_unsettled(job_id)
+
+    job_dir = os.path.join(OUTPUT_FOLDER, job_id)
+    settings = PLATFORM_SETTINGS[platform]
+
+    def update(**kwargs):
+        with exports_lock:
+            state.update(kwargs)
+
+    def run_export():
+        from utils.export import export_video
+        update(status="processing")
+        try:
+            export_video(
+                os.path.join(job_dir, "reel.mp4"),
+                os.path.join(job_dir, f"reel_{platform}.mp4"),
+                settings["resolution"],
+                settings["max_duration"],
+                on_progress=lambda fraction, _speed, _eta: update(progress=int(fraction * 100)),
+            )
+            update(status="done", progress=100)
+        except Exception as e:
+            logger.error(f"Export {job_id}/{platform} error: {e}")
+            update(status="error", error=str(e))
+
+    try:
+        export_scheduler.submit(f"{job_id}:{platform}", run_export)
+    except QueueFullError:
+        with exports_lock:
+            exports.pop(key, None)
+        raise
+    return dict(state)
+
+
+def export_payload(job_id: str, platform: str, state: dict) -> dict:
+    return {
+        **state,
+        "platform": platform,
+        "status_url": f"/api/export/{job_id}/{platform}/status",
+        "download_url": f"/api/export/{job_id}/{platform}",
+    }
+
+
+def _validate_export(job_id, platform):
     if not is_valid_job_id(job_id):
         return jsonify({"error": "Invalid job ID"}), 400
     if platform not in PLATFORM_SETTINGS:
         return jsonify({"error": f"Unknown platform. Supported: {', '.join(PLATFORM_SETTINGS.keys())}"}), 400
-
-    source_video = os.path.join(OUTPUT_FOLDER, job_id, "reel.mp4")
-    if not os.path.exists(source_video):
+    if not os.path.exists(os.path.join(OUTPUT_FOLDER, job_id, "reel.mp4")):
         return jsonify({"error": "Video not found"}), 404
+    return None
 
-    settings = PLATFORM_SETTINGS[platform]
-    w, h = settings["resolution"]
-    export_path = os.path.join(OUTPUT_FOLDER, job_id, f"reel_{platform}.mp4")
 
-    if not os.path.exists(export_path):
-        import subprocess
-        cmd = [
-            "ffmpeg", "-y", "-i", source_video,
-            "-vf", f"scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:black",
-            "-c:v", "libx264", "-preset", "fast", "-crf", "23",
-            "-c:a", "aac", "-b:a", "128k",
-            "-t", str(settings["max_duration"]),
-            "-movflags", "+faststart",
+def _render_in_progress(job_id) -> bool:
+    """True while the job's render (which also writes its platform variants) hasn't finished."""
+    job = job_store.get(job_id)
+    return bool(job and job.get("status") in ("queued", "processing"))
+
+
+@app.route("/api/export/<job_id>/<platform>", methods=["GET", "POST"])
+def export_for_platform(job_id, platform):
+    """
+    Platform-optimized copy of a reel.
+
+    GET downloads the export if it's ready. Otherwise (and for POST) the
+    export is started in the background and 202 is returned with a status URL.
+    """
+    error = _validate_export(job_id, platform)
+    if error:
+        return error
+    if _render_in_progress(job_id):
+        response = jsonify({"error": "The reel is still rendering. Try the export again when it's done."})
+        response.status_code = 409
+        response.headers["Retry-After"] = "5"
+        return response
+
+    export_path = os.path.join(OUTPUT_FOLDER, job_id, f"reel_{platform}.mp4")
+    with exports_lock:
+        state = exports.get((job_id, platform))
+        busy = bool(state and state["status"] in ("queued", "processing"))
+
+    output_index.touch(job_id, time.time())
+    if os.path.exists(export_path) and not busy:
+        if request.method == "POST":
+            return jsonify(export_payload(job_id, platform, {"status": "done", "progress": 100, "error": None}))
+        return send_file(
             export_path,
-        ]
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            if result.returncode != 0:
-                logger.error(f"Export error: {result.stderr}")
-                return jsonify({"error": "Export encoding failed"}), 500
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
+            mimetype="video/mp4",
+            as_attachment=True,
+            download_name=f"vidgo_{platform}_{job_id}.mp4",
+        )
 
-    return send_file(
-        export_path,
-        mimetype="video/mp4",
-        as_attachment=True,
-        download_name=f"vidgo_{platform}_{job_id}.mp4",
-    )
+    # Only charge for starting an export, not for joining one already running
+    if not busy:
+        limited = check_rate_limit(request.remote_addr, EXPORT_COST)
+        if limited:
+            return limited
+
+    try:
+        state = start_export(job_id, platform)
+    except QueueFullError as e:
+        return _queue_full_response(e.retry_after)
+
+    response = jsonify(export_payload(job_id, platform, state))
+    response.status_code = 202
+    response.headers["Retry-After"] = "2"
+    return response
+
+
+@app.route("/api/export/<job_id>/<platform>/status")
+def export_status(job_id, platform):
+    error = _validate_export(job_id, platform)
+    if error:
+        return error
+    with exports_lock:
+        state = exports.get((job_id, platform))
+        state = dict(state) if state else None
+    if state is None:
+        export_path = os.path.join(OUTPUT_FOLDER, job_id, f"reel_{platform}.mp4")
+        if not os.path.exists(export_path):
+            return jsonify({"error": "Export not started"}), 404
+        state = {"status": "done", "progress": 100, "error": None}
+    return jsonify(export_payload(job_id, platform, state))
 
 
 # ── Error Handlers ──────────────────────────────────────────
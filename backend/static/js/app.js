@@ -575,8 +575,107 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   }
 
-  // ── Job Status Polling ──────────────────────────────────
+  // ── Job Status Updates ──────────────────────────────────
+  // Prefer the pushed event stream; fall back to polling where EventSource
+  // isn't available or the stream can't be opened.
   function pollJobStatus(jobId) {
+    if (!window.EventSource) {
+      pollJobStatusInterval(jobId);
+      return;
+    }
+
+    const source = new EventSource(`/api/events/${jobId}`);
+    let received = false;
+
+    source.onmessage = (event) => {
+      received = true;
+      const data = JSON.parse(event.data);
+      if (handleJobUpdate(data)) source.close();
+    };
+
+    source.addEventListener('gone', () => {
+      source.close();
+      hideProgress();
+      setLoading(false);
+      showToast('Job not found', 'error');
+    });
+
+    source.onerror = () => {
+      // EventSource reconnects on its own (resuming via Last-Event-ID);
+      // only give up on it if it never delivered anything.
+      if (!received) {
+        source.close();
+        pollJobStatusInterval(jobId);
+      }
+    };
+  }
+
+  // Returns true once the job has finished (successfully or not)
+  function handleJobUpdate(data) {
+    let message = data.message;
+    if (data.eta_seconds != null) message += ` · ~${data.eta_seconds}s left`;
+    if (data.encode_speed) message += ` (${data.encode_speed}x)`;
+    if (data.status === 'queued' && data.estimated_wait_seconds != null) {
+      message += ` · ~${data.estimated_wait_seconds}s wait`;
+    }
+    showProgress(data.progress, message);
+
+    if (data.status === 'processing' && data.result && data.result.preview_url) {
+      showPreview(data.result);
+    }
+
+    if (data.status === 'done') {
+      hideProgress();
+      setLoading(false);
+      showResult(data.result);
+      showToast('Reel generated successfully! 🎬', 'success');
+      return true;
+    } else if (data.status === 'error') {
+      hideProgress();
+      setLoading(false);
+      showToast(data.error || 'Generation failed', 'error');
+      return true;
+    } else if (data.status === 'cancelled') {
+      hideProgress();
+      setLoading(false);
+      const cancelBtn = document.getElementById('cancel-render-btn');
+      if (cancelBtn) cancelBtn.remove();
+      showToast('Full-quality render cancelled', 'success');
+      return true;
+    }
+    return false;
+  }
+
+  // ── Draft Preview ───────────────────────────────────────
+  // Shown while the full-quality encode is still running; the user can stop
+  // the full render from here if the draft is all they needed to see.
+  function showPreview(data) {
+    if (document.getElementById('preview-video')) return;
+    resultSection.innerHTML = `
+      <div class="card result-section">
+        <h3 class="card-title"><span class="icon">👀</span> Draft Preview</h3>
+        <div class="video-wrapper">
+          <video id="preview-video" controls autoplay muted src="${data.preview_url}"></video>
+        </div>
+        <div class="result-actions">
+          <button type="button" id="cancel-render-btn" class="btn-download">
+            <span>⏹️</span> Stop Full Render
+          </button>
+        </div>
+      </div>
+    `;
+    document.getElementById('cancel-render-btn').addEventListener('click', async () => {
+      try {
+        const res = await fetch(`/api/cancel/${data.job_id}`, { method: 'POST' });
+        const body = await res.json();
+        if (!res.ok) throw new Error(body.error || 'Could not cancel');
+      } catch (err) {
+        showToast(err.message || 'Could not cancel', 'error');
+      }
+    });
+  }
+
+  function pollJobStatusInterval(jobId) {
     const pollInterval = setInterval(async () => {
       try {
         const res = await fetch(`/api/status/${jobId}`);
@@ -590,20 +689,7 @@ document.addEventListener('DOMContentLoaded', () => {
           return;
         }
 
-        showProgress(data.progress, data.message);
-
-        if (data.status === 'done') {
-          clearInterval(pollInterval);
-          hideProgress();
-          setLoading(false);
-          showResult(data.result);
-          showToast('Reel generated successfully! 🎬', 'success');
-        } else if (data.status === 'error') {
-          clearInterval(pollInterval);
-          hideProgress();
-          setLoading(false);
-          showToast(data.error || 'Generation failed', 'error');
-        }
+        if (handleJobUpdate(data)) clearInterval(pollInterval);
 
       } catch (err) {
         clearInterval(pollInterval);
@@ -676,9 +762,50 @@ document.addEventListener('DOMContentLoaded', () => {
         </div>
       </div>
     `;
+    resultSection.querySelectorAll('.share-btn').forEach(btn => {
+      btn.addEventListener('click', (e) => {
+        e.preventDefault();
+        startExport(btn);
+      });
+    });
     resultSection.scrollIntoView({ behavior: 'smooth', block: 'center' });
   }
 
+  // ── Platform Export ─────────────────────────────────────
+  // Exports run as background jobs; download once the server reports done.
+  async function startExport(btn) {
+    if (btn.dataset.busy) return;
+    const sub = btn.querySelector('.share-sub');
+    const originalSub = sub.textContent;
+    btn.dataset.busy = '1';
+
+    const finish = () => {
+      delete btn.dataset.busy;
+      sub.textContent = originalSub;
+    };
+
+    try {
+      const res = await fetch(btn.getAttribute('href'), { method: 'POST' });
+      let data = await res.json();
+      if (!res.ok) throw new Error(data.error || 'Export failed');
+
+      while (data.status === 'queued' || data.status === 'processing') {
+        sub.textContent = data.status === 'queued' ? 'Queued...' : `Exporting ${data.progress}%`;
+        await new Promise(r => setTimeout(r, 1000));
+        const statusRes = await fetch(data.status_url);
+        data = await statusRes.json();
+        if (!statusRes.ok) throw new Error(data.error || 'Export failed');
+      }
+
+      if (data.status === 'error') throw new Error(data.error || 'Export failed');
+      window.location.href = data.download_url;
+    } catch (err) {
+      showToast(err.message || 'Export failed', 'error');
+    } finally {
+      finish();
+    }
+  }
+
   // ── Toast Notifications ─────────────────────────────────
   function showToast(message, type = 'error') {
     document.querySelectorAll('.toast').forEach(t => t.remove());
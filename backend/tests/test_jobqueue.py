@@ -0,0 +1,56 @@
+import pytest
+
+from utils import jobqueue
+from utils.jobqueue import SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "queue.db"))
+
+
+def test_claims_in_fifo_order(queue):
+    assert queue.enqueue("a", {"n": 1}) == 1
+    assert queue.enqueue("b", {"n": 2}) == 2
+    assert queue.depth() == 2
+
+    assert queue.claim("w1") == ("a", {"n": 1})
+    assert queue.position("a") == 0
+    assert queue.position("b") == 1
+    assert queue.claim("w2") == ("b", {"n": 2})
+    assert queue.claim("w3") is None
+
+
+def test_secrets_go_to_the_first_claim_only(queue, monkeypatch):
+    queue.enqueue("a", {"n": 1}, secrets={"api_key": "secret"})
+    assert queue.claim("w1") == ("a", {"n": 1, "api_key": "secret"})
+
+    monkeypatch.setattr(jobqueue, "CLAIM_LEASE_SECONDS", -1)
+    assert queue.claim("w2") == ("a", {"n": 1})
+
+
+def test_expired_lease_is_reclaimed(queue, monkeypatch):
+    queue.enqueue("a", {"n": 1})
+    assert queue.claim("w1")[0] == "a"
+    assert queue.claim("w2") is None
+
+    # The first worker is presumed dead once its lease runs out
+    monkeypatch.setattr(jobqueue, "CLAIM_LEASE_SECONDS", -1)
+    assert queue.claim("w2")[0] == "a"
+
+
+def test_ack_and_cancel(queue):
+    queue.enqueue("a", {})
+    queue.enqueue("b", {})
+    queue.claim("w1")
+
+    assert not queue.cancel("a")  # already claimed
+    assert queue.cancel("b")
+    assert queue.position("b") is None
+    queue.ack("a")
+    assert queue.position("a") is None
+    assert queue.depth() == 0
+
+
+def test_claim_timeout_polls(queue):
+    assert queue.claim("w1", timeout=0.2) is None
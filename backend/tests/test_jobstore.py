@@ -0,0 +1,40 @@
+import pytest
+
+from utils.jobstore import MemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore()
+    return SQLiteJobStore(str(tmp_path / "jobs.db"))
+
+
+def test_update_bumps_version(store):
+    store.create("a", {"status": "queued", "created_at": 1.0})
+    assert store.update("a", status="processing", progress=10)
+    job = store.get("a")
+    assert job["status"] == "processing" and job["progress"] == 10
+    assert job["version"] == 1
+    assert not store.update("missing", status="done")
+
+
+def test_delete_older_than_skips_busy_jobs(store):
+    store.create("old-done", {"status": "completed", "created_at": 10.0})
+    store.create("old-error", {"status": "error", "created_at": 10.0})
+    store.create("old-queued", {"status": "queued", "created_at": 10.0})
+    store.create("old-processing", {"status": "processing", "created_at": 10.0})
+    store.create("old-exporting", {"status": "exporting", "created_at": 10.0})
+    store.create("new-done", {"status": "completed", "created_at": 100.0})
+
+    assert sorted(store.delete_older_than(50.0)) == ["old-done", "old-error"]
+    assert store.get("old-done") is None
+    for job_id in ("old-queued", "old-processing", "old-exporting", "new-done"):
+        assert store.get(job_id) is not None
+
+
+def test_wait_for_change_returns_after_update(store):
+    store.create("a", {"status": "queued", "created_at": 1.0})
+    assert store.wait_for_change("a", 0, timeout=0.05)["version"] == 0
+    store.update("a", status="processing")
+    assert store.wait_for_change("a", 0, timeout=1.0)["status"] == "processing"
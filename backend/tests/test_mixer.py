@@ -0,0 +1,102 @@
+import shutil
+import struct
+import subprocess
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils import audio, mixer  # noqa: E402
+
+RATE = mixer.MIX_RATE
+
+
+def write_float_wav(path, samples):
+    """float32 stereo WAV in the mixer's native layout (memory-mapped by _load_pcm)."""
+    data = np.asarray(samples, dtype="<f4").tobytes()
+    channels = mixer.MIX_CHANNELS
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE")
+        f.write(b"fmt " + struct.pack("<IHHIIHH", 16, 3, channels, RATE, RATE * channels * 4, channels * 4, 32))
+        f.write(b"data" + struct.pack("<I", len(data)))
+        f.write(data)
+
+
+def read_wav16(path):
+    with wave.open(path, "rb") as w:
+        frames = w.readframes(w.getnframes())
+        channels = w.getnchannels()
+    return np.frombuffer(frames, dtype="<i2").reshape(-1, channels).astype(np.float32) / 32767
+
+
+def tone(seconds, amplitude, freq=440.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    mono = amplitude * np.sin(2 * np.pi * freq * t)
+    return np.stack([mono] * mixer.MIX_CHANNELS, axis=1)
+
+
+def rms_db(samples):
+    return 20 * np.log10(np.sqrt(np.mean(np.square(samples))))
+
+
+def test_mix_weights_inputs_like_amix(tmp_path):
+    voice, music, out = tmp_path / "voice.wav", tmp_path / "music.wav", tmp_path / "mix.wav"
+    write_float_wav(voice, tone(3, 0.4))
+    write_float_wav(music, np.zeros((RATE, mixer.MIX_CHANNELS)))
+
+    mixer.mix_pcm(str(voice), str(music), str(out), music_volume=0.5, ducking=False)
+
+    mixed = read_wav16(str(out))
+    assert len(mixed) == 3 * RATE
+    assert np.max(np.abs(mixed)) == pytest.approx(0.4 * mixer.AMIX_WEIGHT, abs=1e-3)
+
+
+def test_music_loops_to_narration_length(tmp_path):
+    voice, music, out = tmp_path / "voice.wav", tmp_path / "music.wav", tmp_path / "mix.wav"
+    write_float_wav(voice, np.zeros((5 * RATE, mixer.MIX_CHANNELS)))
+    write_float_wav(music, tone(1, 0.5))
+
+    mixer.mix_pcm(str(voice), str(music), str(out), music_volume=1.0, ducking=False)
+
+    mixed = read_wav16(str(out))
+    assert len(mixed) == 5 * RATE
+    # Still playing in the 4th second, before the 2 s fade-out starts
+    assert np.max(np.abs(mixed[int(2.5 * RATE):3 * RATE])) > 0.2
+
+
+def test_ducking_lowers_music_under_speech(tmp_path):
+    voice, music = tmp_path / "voice.wav", tmp_path / "music.wav"
+    speech = np.zeros((6 * RATE, mixer.MIX_CHANNELS), dtype=np.float32)
+    speech[: 3 * RATE] = tone(3, 0.3, freq=200.0)
+    write_float_wav(voice, speech)
+    write_float_wav(music, tone(6, 0.5))
+
+    gain = mixer._duck_gain(mixer._load_pcm(str(voice)), 6 * RATE)
+
+    assert gain[2 * RATE] == pytest.approx(10 ** (mixer.DUCK_DB / 20), rel=0.05)
+    assert gain[int(5.5 * RATE)] > 0.9
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_levels_match_ffmpeg_mix(tmp_path, monkeypatch):
+    voice, music = tmp_path / "voice.wav", tmp_path / "music.wav"
+    write_float_wav(voice, tone(4, 0.3, freq=300.0))
+    write_float_wav(music, tone(4, 0.5, freq=500.0))
+
+    numpy_out = tmp_path / "numpy.wav"
+    mixer.mix_pcm(str(voice), str(music), str(numpy_out), music_volume=0.3, ducking=False)
+
+    monkeypatch.setattr(audio, "MUSIC_DUCKING", False)
+    graph = audio.music_mix_filter("[0:a]", "[1:a]", 4.0, 0.3, "[out]")
+    ffmpeg_out = tmp_path / "ffmpeg.wav"
+    subprocess.run(
+        ["ffmpeg", "-y", "-v", "error", "-i", str(voice), "-stream_loop", "-1", "-i", str(music),
+         "-filter_complex", graph, "-map", "[out]", "-c:a", "pcm_s16le", str(ffmpeg_out)],
+        check=True, timeout=60,
+    )
+
+    # Compare the part before the fade-out
+    a = read_wav16(str(numpy_out))[: RATE]
+    b = read_wav16(str(ffmpeg_out))[: RATE]
+    assert rms_db(a) == pytest.approx(rms_db(b), abs=0.5)
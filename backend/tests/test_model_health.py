@@ -0,0 +1,39 @@
+from utils.ai_script import ModelHealth
+
+MODELS = ["lite", "flash", "pro"]
+
+
+def test_configured_order_until_measured():
+    health = ModelHealth()
+    assert health.route("k", MODELS) == MODELS
+
+    health.record_success("k", "pro", latency=1.0)
+    health.record_success("k", "lite", latency=5.0)
+    assert health.route("k", MODELS) == ["flash", "pro", "lite"]
+
+
+def test_cooling_model_is_left_out_until_probed():
+    health = ModelHealth(base_cooldown=60)
+    health.record_failure("k", "lite", "rate_limit")
+    assert health.route("k", MODELS) == ["flash", "pro"]
+    assert health.route("other-key", MODELS) == MODELS
+
+    # Recovered without a latency sample: back in its configured place
+    health.record_success("k", "lite")
+    assert health.route("k", MODELS) == MODELS
+
+
+def test_all_cooling_returns_soonest():
+    health = ModelHealth(base_cooldown=60)
+    health.record_failure("k", "lite", "not_found")
+    health.record_failure("k", "flash", "rate_limit")
+    health.record_failure("k", "pro", "rate_limit")
+    health.record_failure("k", "pro", "rate_limit")
+    assert health.route("k", MODELS) == ["flash"]
+
+
+def test_state_is_bounded():
+    health = ModelHealth(max_entries=4)
+    for n in range(10):
+        health.record_success(f"key{n}", "lite", latency=1.0)
+    assert len(health._state) == 4
@@ -0,0 +1,42 @@
+import io
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from utils.ranges import resolve_byte_ranges, if_range_matches, read_range
+
+IfRange = namedtuple("IfRange", "etag date")
+
+
+def test_open_ended_and_suffix_ranges():
+    assert resolve_byte_ranges([(100, None)], 1000) == [(100, 1000)]
+    assert resolve_byte_ranges([(-200, None)], 1000) == [(800, 1000)]
+    assert resolve_byte_ranges([(-5000, None)], 1000) == [(0, 1000)]
+
+
+def test_ranges_are_clamped_and_unsatisfiable_dropped():
+    assert resolve_byte_ranges([(900, 5000)], 1000) == [(900, 1000)]
+    assert resolve_byte_ranges([(1000, 1200), (2000, None)], 1000) == []
+
+
+def test_overlapping_and_adjacent_ranges_merge():
+    ranges = [(500, 600), (0, 100), (50, 200), (200, 300)]
+    assert resolve_byte_ranges(ranges, 1000) == [(0, 300), (500, 600)]
+
+
+def test_repeated_full_ranges_collapse_to_one():
+    assert resolve_byte_ranges([(0, None)] * 10, 1000) == [(0, 1000)]
+
+
+def test_if_range_matches():
+    modified = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert if_range_matches(IfRange(None, None), "abc", modified)
+    assert if_range_matches(IfRange("abc", None), "abc", modified)
+    assert not if_range_matches(IfRange("old", None), "abc", modified)
+    assert if_range_matches(IfRange(None, modified), "abc", modified)
+    assert not if_range_matches(IfRange(None, datetime(2025, 1, 1, tzinfo=timezone.utc)), "abc", modified)
+
+
+def test_read_range():
+    data = bytes(range(256)) * 10
+    assert b"".join(read_range(io.BytesIO(data), 10, 300)) == data[10:300]
+    assert b"".join(read_range(io.BytesIO(data), 2500, 3000)) == data[2500:]
@@ -0,0 +1,68 @@
+import pytest
+
+from utils import ratelimit
+from utils.ratelimit import MemoryRateLimiter, SQLiteRateLimiter
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path, clock):
+    if request.param == "memory":
+        return MemoryRateLimiter(burst=3, rate=0.5)
+    return SQLiteRateLimiter(burst=3, rate=0.5, path=str(tmp_path / "ratelimit.db"))
+
+
+def test_burst_then_limited(limiter):
+    assert [limiter.take("ip")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.take("ip")
+    assert not allowed
+    assert retry_after == 2  # one token at 0.5/s
+
+
+def test_refills_over_time(limiter, clock):
+    for _ in range(3):
+        limiter.take("ip")
+    clock.now += 2
+    assert limiter.take("ip") == (True, 0)
+    assert not limiter.take("ip")[0]
+
+
+def test_refill_is_capped_at_burst(limiter, clock):
+    limiter.take("ip")
+    clock.now += 3600
+    assert [limiter.take("ip")[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_keys_are_independent(limiter):
+    for _ in range(3):
+        limiter.take("a")
+    assert not limiter.take("a")[0]
+    assert limiter.take("b")[0]
+
+
+def test_cost_is_capped_at_burst(limiter):
+    assert limiter.take("ip", cost=10) == (True, 0)
+    allowed, retry_after = limiter.take("ip", cost=1.5)
+    assert not allowed and retry_after == 3
+
+
+def test_idle_buckets_are_forgotten(clock):
+    limiter = MemoryRateLimiter(burst=3, rate=0.5)
+    limiter.take("a")
+    clock.now += limiter.idle_seconds + 1
+    limiter.take("b")
+    assert len(limiter) == 1
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from utils.scheduler import RenderScheduler, QueueFullError
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def busy_scheduler():
+    """One worker, two queue slots, with job "running" blocked until the test ends."""
+    release = threading.Event()
+    scheduler = RenderScheduler(workers=1, max_queue=2)
+    scheduler.submit("running", release.wait)
+    wait_until(lambda: scheduler.position("running") == 0)
+    yield scheduler
+    release.set()
+
+
+def test_queue_is_bounded(busy_scheduler):
+    assert busy_scheduler.submit("a", lambda: None) == 1
+    assert busy_scheduler.submit("b", lambda: None) == 2
+    assert busy_scheduler.is_full()
+
+    with pytest.raises(QueueFullError) as exc:
+        busy_scheduler.submit("c", lambda: None)
+    assert exc.value.retry_after >= 1
+
+
+def test_positions(busy_scheduler):
+    busy_scheduler.submit("a", lambda: None)
+    busy_scheduler.submit("b", lambda: None)
+
+    assert busy_scheduler.position("running") == 0
+    assert busy_scheduler.position("a") == 1
+    assert busy_scheduler.position("b") == 2
+    assert busy_scheduler.position("unknown") is None
+    assert busy_scheduler.estimated_wait("b") > busy_scheduler.estimated_wait("a")
+
+
+def test_cancel_frees_a_slot(busy_scheduler):
+    busy_scheduler.submit("a", lambda: None)
+    busy_scheduler.submit("b", lambda: None)
+
+    assert busy_scheduler.cancel("a")
+    assert not busy_scheduler.cancel("a")
+    assert not busy_scheduler.cancel("running")
+    assert busy_scheduler.position("b") == 1
+    busy_scheduler.submit("c", lambda: None)
+
+
+def test_queued_jobs_run_in_order():
+    scheduler = RenderScheduler(workers=1, max_queue=8)
+    done = []
+    for n in range(5):
+        scheduler.submit(f"job{n}", done.append, n)
+    wait_until(lambda: len(done) == 5)
+    assert done == [0, 1, 2, 3, 4]
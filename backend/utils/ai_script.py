@@ -1,10 +1,21 @@
 """
 Vidgo.AI - AI Script Generation Module
 Uses Google Gemini API (new google-genai SDK) to generate narration scripts from images.
+Clients are pooled per API key, and generated scripts are cached by image
+content, tone and prompt so repeat requests skip the model. A health
+registry routes around rate-limited or missing models.
 """
 
+import os
+import re
+import time
+import sqlite3
+import hashlib
 import logging
-import base64
+import threading
+from collections import OrderedDict
+
+from utils.cache import CACHE_ROOT, hash_key
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +27,322 @@ TONE_PROMPTS = {
     "inspirational": "Write in an uplifting, motivational, and inspiring tone that moves people.",
 }
 
+SCRIPT_CACHE_SIZE = int(os.getenv("SCRIPT_CACHE_SIZE", "256"))  # entries kept in memory; 0 disables
+SCRIPT_CACHE_TTL_SECONDS = int(os.getenv("SCRIPT_CACHE_TTL_SECONDS", "86400"))
+SCRIPT_CACHE_STORE = os.getenv("SCRIPT_CACHE_STORE", "memory")  # "memory" or "sqlite"
+SCRIPT_CACHE_DB_PATH = os.getenv("SCRIPT_CACHE_DB_PATH") or os.path.join(CACHE_ROOT, "scripts.db")
+SCRIPT_CACHE_DB_MAX_ENTRIES = 10000
+CLIENT_POOL_SIZE = 16
+# Fallback chain, in order of preference when nothing is known about latency
+MODELS = ["gemini-2.0-flash-lite", "gemini-2.0-flash", "gemini-2.5-flash"]
+MODEL_COOLDOWN_SECONDS = float(os.getenv("GEMINI_MODEL_COOLDOWN_SECONDS", "20"))
+MODEL_COOLDOWN_MAX_SECONDS = float(os.getenv("GEMINI_MODEL_COOLDOWN_MAX_SECONDS", "600"))
+MODEL_NOT_FOUND_COOLDOWN_SECONDS = 3600
+LATENCY_SMOOTHING = 0.3  # weight of the newest sample in the latency average
+MODEL_HEALTH_MAX_ENTRIES = 1024  # (API key, model) pairs tracked; least recently used dropped first
+# Bump when the prompt wording changes so old scripts aren't served for it
+PROMPT_VERSION = 1
+
+
+# ── Client pool ────────────────────────────────────────────
+
+_clients: OrderedDict = OrderedDict()  # sha256(api key) -> genai.Client
+_clients_lock = threading.Lock()
+
+
+def _key_id(api_key: str) -> str:
+    """Stand-in for an API key in process-wide tables, so keys aren't held as dict keys."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _get_client(api_key: str):
+    """Shared client per API key, so its HTTP connections are reused across requests."""
+    from google import genai
+
+    pool_key = _key_id(api_key)
+    with _clients_lock:
+        client = _clients.get(pool_key)
+        if client is not None:
+            _clients.move_to_end(pool_key)
+            return client
+    client = genai.Client(api_key=api_key)
+    with _clients_lock:
+        client = _clients.setdefault(pool_key, client)
+        _clients.move_to_end(pool_key)
+        while len(_clients) > CLIENT_POOL_SIZE:
+            _clients.popitem(last=False)
+    return client
+
+
+# ── Model health ───────────────────────────────────────────
+
+class ModelHealth:
+    """
+    Shared circuit breaker for the model fallback chain, per API key and model.
+
+    A 429 or 404 opens the breaker for a cooldown that doubles with each
+    consecutive failure (404s start from a much longer base). Once the
+    cooldown is over the model is probed in the background with a tiny
+    request and only rejoins routing when the probe succeeds. Healthy models
+    are tried fastest first, by a moving average of their success latency;
+    a model with no measurement yet keeps its place in the configured order.
+    State is an LRU bounded at max_entries (key, model) pairs.
+    """
+
+    def __init__(self, base_cooldown: float = MODEL_COOLDOWN_SECONDS,
+                 max_cooldown: float = MODEL_COOLDOWN_MAX_SECONDS,
+                 max_entries: int = MODEL_HEALTH_MAX_ENTRIES):
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.max_entries = max_entries
+        # (key id, model) -> {"failures", "until", "latency", "probing"}
+        self._state: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key_id: str, model: str) -> dict:
+        """State for (key_id, model), created if missing and marked most recently used. Caller holds the lock."""
+        st = self._state.get((key_id, model))
+        if st is None:
+            st = self._state[(key_id, model)] = _new_model_state()
+            while len(self._state) > self.max_entries:
+                self._state.popitem(last=False)
+        else:
+            self._state.move_to_end((key_id, model))
+        return st
+
+    def route(self, key_id: str, models: list, probe=None) -> list:
+        """
+        Models to try, in order. Cooling models are left out; if none is
+        healthy, the one whose cooldown ends first is returned on its own so
+        the request still gets one attempt. probe(model) is started in a
+        background thread for models whose cooldown has run out.
+        """
+        now = time.time()
+        healthy, waiting, to_probe = [], [], []
+        with self._lock:
+            for i, model in enumerate(models):
+                st = self._state.get((key_id, model))
+                if st is not None:
+                    self._state.move_to_end((key_id, model))
+                if st is None or st["failures"] == 0:
+                    healthy.append((st["latency"] if st else None, i, model))
+                    continue
+                waiting.append((st["until"], model))
+                if st["until"] <= now and not st["probing"] and probe is not None:
+                    st["probing"] = True
+                    to_probe.append(model)
+
+        for model in to_probe:
+            threading.Thread(
+                target=self._probe, args=(key_id, model, probe), daemon=True, name=f"gemini-probe-{model}",
+            ).start()
+
+        if healthy:
+            # An unmeasured model ranks just ahead of the fastest measured model
+            # configured after it, so it isn't pushed behind slower ones
+            ranked, fastest_after = [], float("inf")
+            for latency, i, model in reversed(healthy):
+                if latency is None:
+                    ranked.append((fastest_after, i, model))
+                else:
+                    ranked.append((latency, i, model))
+                    fastest_after = min(fastest_after, latency)
+            return [model for _latency, _i, model in sorted(ranked)]
+        return [min(waiting)[1]] if waiting else []
+
+    def record_success(self, key_id: str, model: str, latency: float | None = None):
+        with self._lock:
+            st = self._entry(key_id, model)
+            if st["failures"]:
+                logger.info(f"[Gemini] {model} is available again")
+            st["failures"] = 0
+            st["until"] = 0.0
+            if latency is not None:
+                prev = st["latency"]
+                st["latency"] = latency if prev is None else prev + (latency - prev) * LATENCY_SMOOTHING
+
+    def record_failure(self, key_id: str, model: str, kind: str):
+        """Open the breaker for model; kind is "rate_limit" or "not_found"."""
+        base = MODEL_NOT_FOUND_COOLDOWN_SECONDS if kind == "not_found" else self.base_cooldown
+        with self._lock:
+            st = self._entry(key_id, model)
+            st["failures"] += 1
+            cooldown = min(max(self.max_cooldown, base), base * 2 ** (st["failures"] - 1))
+            st["until"] = time.time() + cooldown
+        logger.warning(f"[Gemini] {model} {kind.replace('_', ' ')}, cooling down for {cooldown:.0f}s")
+
+    def _probe(self, key_id: str, model: str, probe):
+        # The probe's latency isn't recorded: a one-token request would make the
+        # model look faster than real script requests. It keeps the average it
+        # had before the failures, or its configured place if it never had one.
+        try:
+            probe(model)
+            self.record_success(key_id, model)
+        except Exception as e:
+            self.record_failure(key_id, model, _classify_error(e) or "rate_limit")
+        finally:
+            with self._lock:
+                st = self._state.get((key_id, model))
+                if st is not None:
+                    st["probing"] = False
+
+    def snapshot(self) -> dict:
+        """Per-model state across all keys: worst cooldown left and best latency."""
+        now = time.time()
+        out = {}
+        with self._lock:
+            for (_key_id, model), st in self._state.items():
+                entry = out.setdefault(model, {"cooldown_seconds": 0, "latency_ms": None})
+                entry["cooldown_seconds"] = max(entry["cooldown_seconds"], round(max(0.0, st["until"] - now)))
+                if st["latency"] is not None:
+                    ms = round(st["latency"] * 1000)
+                    entry["latency_ms"] = ms if entry["latency_ms"] is None else min(entry["latency_ms"], ms)
+        return out
+
+
+def _new_model_state() -> dict:
+    return {"failures": 0, "until": 0.0, "latency": None, "probing": False}
+
+
+_RATE_LIMIT_RE = re.compile(r"\b429\b|RESOURCE_EXHAUSTED|\bquota\b|\brate[- ]?limit", re.IGNORECASE)
+_NOT_FOUND_RE = re.compile(r"\b404\b|\bnot[ _]found\b", re.IGNORECASE)
+
+
+def _classify_error(error: Exception) -> str | None:
+    """ "rate_limit", "not_found", or None for errors that aren't about the model."""
+    # google-genai API errors carry the HTTP status and the API status name
+    code = getattr(error, "code", None)
+    status = str(getattr(error, "status", "") or "")
+    if code == 429 or status == "RESOURCE_EXHAUSTED":
+        return "rate_limit"
+    if code == 404 or status == "NOT_FOUND":
+        return "not_found"
+    if isinstance(code, int):
+        return None
+    error_str = str(error)
+    if _RATE_LIMIT_RE.search(error_str):
+        return "rate_limit"
+    if _NOT_FOUND_RE.search(error_str):
+        return "not_found"
+    return None
+
+
+model_health = ModelHealth()
+
+
+# ── Script cache ───────────────────────────────────────────
+
+class ScriptCache:
+    """
+    LRU of generated scripts with a TTL, optionally backed by SQLite.
+
+    Memory is checked first. With a database path, entries are also written
+    to SQLite (WAL mode), so they survive restarts and are shared by web
+    processes on one host; a database hit is promoted into memory.
+    """
+
+    def __init__(self, max_entries: int = SCRIPT_CACHE_SIZE, ttl_seconds: int = SCRIPT_CACHE_TTL_SECONDS,
+                 db_path: str | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: OrderedDict = OrderedDict()  # key -> (script, created)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if db_path:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scripts ("
+                " key TEXT PRIMARY KEY,"
+                " script TEXT NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scripts_created ON scripts(created)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                if now - hit[1] < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return hit[0]
+                del self._entries[key]
+        if not self.db_path:
+            return None
+        try:
+            row = self._conn().execute(
+                "SELECT script, created FROM scripts WHERE key = ? AND created > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"[Gemini] Script cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        self._remember(key, row[0], row[1])
+        return row[0]
+
+    def put(self, key: str, script: str):
+        now = time.time()
+        self._remember(key, script, now)
+        if not self.db_path:
+            return
+        try:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO scripts (key, script, created) VALUES (?, ?, ?)", (key, script, now))
+            conn.execute("DELETE FROM scripts WHERE created < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM scripts WHERE key NOT IN"
+                " (SELECT key FROM scripts ORDER BY created DESC LIMIT ?)",
+                (SCRIPT_CACHE_DB_MAX_ENTRIES,),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"[Gemini] Script cache write failed: {e}")
+
+    def _remember(self, key: str, script: str, created: float):
+        with self._lock:
+            self._entries[key] = (script, created)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_script_cache = None
+_script_cache_lock = threading.Lock()
+
+
+def _get_script_cache() -> ScriptCache:
+    global _script_cache
+    with _script_cache_lock:
+        if _script_cache is None:
+            db_path = SCRIPT_CACHE_DB_PATH if SCRIPT_CACHE_STORE == "sqlite" else None
+            if SCRIPT_CACHE_STORE not in ("memory", "sqlite"):
+                logger.warning(f"Unknown SCRIPT_CACHE_STORE '{SCRIPT_CACHE_STORE}', using in-memory cache")
+            _script_cache = ScriptCache(db_path=db_path)
+        return _script_cache
+
+
+def _script_cache_key(image_data: list, tone: str, custom_prompt: str, api_key: str) -> str:
+    # The key's hash is part of it, so a cached script is only served to a
+    # key that Gemini already accepted for the same request
+    images = tuple(
+        (hashlib.sha256(img["data"]).hexdigest(), img["mime_type"]) for img in image_data
+    )
+    return hash_key("script", PROMPT_VERSION, _key_id(api_key), images, tone, custom_prompt)
+
+
+# ── Generation ─────────────────────────────────────────────
 
 def generate_narration_script(
     image_data: list,
@@ -27,7 +354,7 @@ def generate_narration_script(
     Generate a narration script from images using Google Gemini API.
     
     Args:
-        image_data: List of dicts with 'data' (base64) and 'mime_type'
+        image_data: List of dicts with 'data' (raw image bytes) and 'mime_type'
         tone: One of professional, casual, funny, dramatic, inspirational
         custom_prompt: Optional additional instructions
         api_key: Gemini API key
@@ -42,13 +369,20 @@ def generate_narration_script(
             "Get a free key at https://aistudio.google.com/apikey"
         )
 
+    cache = _get_script_cache() if SCRIPT_CACHE_SIZE > 0 else None
+    cache_key = _script_cache_key(image_data, tone, custom_prompt, api_key) if cache else None
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[Gemini] Script cache hit ({len(image_data)} images, tone={tone})")
+            return cached
+
     try:
-        from google import genai
         from google.genai import types
     except ImportError:
         raise Exception("google-genai package not installed. Run: pip install google-genai")
 
-    client = genai.Client(api_key=api_key)
+    client = _get_client(api_key)
 
     tone_instruction = TONE_PROMPTS.get(tone, TONE_PROMPTS["professional"])
 
@@ -74,20 +408,29 @@ Rules:
     # Build content parts: text + images
     parts = [types.Part.from_text(text=system_prompt)]
     for img in image_data:
-        img_bytes = base64.b64decode(img["data"])
-        parts.append(types.Part.from_bytes(data=img_bytes, mime_type=img["mime_type"]))
+        parts.append(types.Part.from_bytes(data=bytes(img["data"]), mime_type=img["mime_type"]))
     parts.append(types.Part.from_text(text="Now write the narration script for these images:"))
 
     # Try multiple models in case of quota limits
-    models_to_try = ["gemini-2.0-flash-lite", "gemini-2.0-flash", "gemini-2.5-flash"]
-    last_error = None
+    def probe(model_name):
+        client.models.generate_content(
+            model=model_name,
+            contents="Reply with OK.",
+            config=types.GenerateContentConfig(max_output_tokens=1),
+        )
+
+    # Try models in health order; rate-limited ones are skipped until they recover
+    key_id = _key_id(api_key)
+    models_to_try = model_health.route(key_id, MODELS, probe)
 
     for model_name in models_to_try:
         try:
+            started = time.monotonic()
             response = client.models.generate_content(
                 model=model_name,
                 contents=[types.Content(role="user", parts=parts)],
             )
+            model_health.record_success(key_id, model_name, time.monotonic() - started)
 
             script = response.text.strip()
 
@@ -97,19 +440,16 @@ Rules:
                 script = script[1:-1]
 
             logger.info(f"[Gemini] Generated script with {model_name}: {len(script)} chars")
+            if cache and script:
+                cache.put(cache_key, script)
             return script
 
         except Exception as e:
-            last_error = e
-            error_str = str(e)
-            if "429" in error_str or "quota" in error_str.lower() or "rate" in error_str.lower():
-                logger.warning(f"[Gemini] {model_name} rate-limited, trying next model...")
-                continue
-            elif "404" in error_str or "not found" in error_str.lower():
-                logger.warning(f"[Gemini] {model_name} not found, trying next model...")
-                continue
-            else:
-                raise Exception(f"AI script generation failed: {error_str[:300]}")
+            kind = _classify_error(e)
+            if kind is None:
+                raise Exception(f"AI script generation failed: {str(e)[:300]}")
+            model_health.record_failure(key_id, model_name, kind)
+            logger.warning(f"[Gemini] {model_name} unavailable, trying next model...")
 
     # All models exhausted
     raise Exception(
@@ -1,105 +1,75 @@
 """
 Vidgo.AI - Audio Mixing Module
-Mixes narration with background music using FFmpeg.
+Chooses how narration and background music are mixed: in-process with
+NumPy (utils.mixer) when it is installed, otherwise by FFmpeg inside the
+video render using the filter graph built here.
 """
 
 import os
 import subprocess
 import logging
 
+from utils.mixer import MUSIC_DUCKING, DUCK_THRESHOLD
+
 logger = logging.getLogger(__name__)
 
+AUDIO_MIXER = os.getenv("AUDIO_MIXER", "ffmpeg")  # "ffmpeg" (mix inside the render) or "numpy"
 
-def mix_audio(
-    narration_path: str,
-    music_path: str,
-    output_path: str,
-    music_volume: float = 0.15,
-) -> str:
-    """
-    Mix narration audio with background music.
-    
-    The music is looped to match narration length and faded out at the end.
-    Music volume is reduced to sit underneath the voice.
-    
-    Args:
-        narration_path: Path to narration MP3
-        music_path: Path to background music MP3
-        output_path: Output path for mixed audio
-        music_volume: Volume level for music (0.0 - 1.0), default 0.15
-    
-    Returns:
-        Path to the mixed audio file
+
+def in_process_mixing() -> bool:
     """
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    True if the pipeline should premix with the NumPy mixer rather than mix during the render.
 
-    if not os.path.exists(narration_path):
-        raise FileNotFoundError(f"Narration file not found: {narration_path}")
-    if not os.path.exists(music_path):
-        logger.warning(f"Music file not found: {music_path}, using narration only")
-        return narration_path
+    The in-render FFmpeg mix is the default: it costs no extra pass over the
+    audio. The NumPy premix is only worth it for its smoother ducking, so it
+    runs when AUDIO_MIXER=numpy and MUSIC_DUCKING is on.
+    """
+    if AUDIO_MIXER != "numpy" or not MUSIC_DUCKING:
+        return False
+    from utils.mixer import numpy_available
+    if numpy_available():
+        return True
+    logger.warning("numpy not installed; mixing with FFmpeg. Run: pip install numpy")
+    return False
 
-    # Clamp volume
-    music_volume = max(0.0, min(1.0, music_volume))
 
-    # Get narration duration for fade-out timing
-    narration_duration = _get_duration(narration_path)
-    fade_start = max(0, narration_duration - 2.0)  # 2-second fade out
+def music_mix_filter(voice: str, music: str, narration_duration: float, music_volume: float, out: str) -> str:
+    """
+    FFmpeg filter graph mixing a narration stream with a (looped) music stream.
 
-    # FFmpeg command:
-    # - Input 0: narration
-    # - Input 1: music (streamed/looped)
-    # - Filter: loop music, reduce volume, fade out, mix with narration
-    filter_complex = (
-        f"[1:a]aloop=loop=-1:size=2e+09,atrim=0:{narration_duration},"
-        f"volume={music_volume},"
-        f"afade=t=out:st={fade_start:.1f}:d=2.0[music];"
-        f"[0:a][music]amix=inputs=2:duration=first:dropout_transition=2[out]"
+    The music is trimmed to the narration, lowered to music_volume, faded
+    out over the last 2 seconds and, with MUSIC_DUCKING, ducked under the
+    voice. Used by the in-render mix in create_reel.
+    If narration_duration is None the mix still ends with the narration
+    (amix duration=first), just without the fade-out.
+    """
+    bed = f"{music}volume={music_volume}"
+    if narration_duration is not None:
+        fade_start = max(0, narration_duration - 2.0)
+        bed = (
+            f"{music}atrim=0:{narration_duration},"
+            f"volume={music_volume},"
+            f"afade=t=out:st={fade_start:.1f}:d=2.0"
+        )
+    if not MUSIC_DUCKING:
+        return f"{bed}[music]; {voice}[music]amix=inputs=2:duration=first:dropout_transition=2{out}"
+    return (
+        f"{voice}asplit=2[voice][sc]; {bed}[bed]; "
+        f"[bed][sc]sidechaincompress=threshold={DUCK_THRESHOLD}:ratio=6:attack=50:release=400[music]; "
+        f"[voice][music]amix=inputs=2:duration=first:dropout_transition=2{out}"
     )
 
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", narration_path,
-        "-i", music_path,
-        "-filter_complex", filter_complex,
-        "-map", "[out]",
-        "-c:a", "libmp3lame", "-b:a", "192k",
-        output_path,
-    ]
 
-    logger.info(f"Mixing audio: narration={narration_duration:.1f}s, music_vol={music_volume}")
-
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        if result.returncode != 0:
-            logger.error(f"Audio mix error: {result.stderr}")
-            # Fallback: return narration without music
-            logger.warning("Falling back to narration-only audio")
-            return narration_path
-
-        logger.info(f"Mixed audio saved: {output_path} ({os.path.getsize(output_path)} bytes)")
-        return output_path
-
-    except subprocess.TimeoutExpired:
-        logger.error("Audio mixing timed out")
-        return narration_path
-    except FileNotFoundError:
-        logger.error("FFmpeg not found for audio mixing")
-        return narration_path
-
-
-def _get_duration(audio_path: str) -> float:
-    """Get audio duration in seconds using ffprobe."""
+def music_is_usable(music_path: str) -> bool:
+    """Quick check that FFmpeg can read an audio stream from music_path."""
+    if not os.path.exists(music_path):
+        return False
     try:
         result = subprocess.run(
-            [
-                "ffprobe", "-v", "quiet",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                audio_path,
-            ],
+            ["ffprobe", "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "stream=codec_type", "-of", "csv=p=0", music_path],
             capture_output=True, text=True, timeout=10,
         )
-        return float(result.stdout.strip())
-    except (subprocess.SubprocessError, ValueError):
-        return 10.0  # Default fallback
+        return result.returncode == 0 and "audio" in result.stdout
+    except (subprocess.SubprocessError, FileNotFoundError):
+        return False
@@ -0,0 +1,133 @@
+"""
+Vidgo.AI - Upload Blob Store Module
+Content-addressed storage for uploaded images. Each distinct upload is
+kept once, named by its SHA-256, and hardlinked into the job directories
+that use it.
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+import threading
+
+from utils.cache import CACHE_ROOT
+
+logger = logging.getLogger(__name__)
+
+# Must be on the same filesystem as the output folder for hardlinks to work
+BLOB_ROOT = os.getenv("VIDGO_BLOB_DIR") or os.path.join(CACHE_ROOT, "blobs")
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = "blobs.txt"
+
+
+class BlobStore:
+    """
+    Directory of upload blobs sharded by the first two hex digits of their hash.
+
+    The filesystem link count is the reference count: a blob whose only
+    remaining link is its own entry here is unused by any job and can go.
+    Job directories record the digests they link in a manifest, so removing
+    a job only has to check its own blobs. Where hardlinks aren't possible
+    the job gets a private copy and holds no reference.
+    """
+
+    def __init__(self, root: str = BLOB_ROOT):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def ingest(self, stream, dest: str) -> str:
+        """
+        Stream an upload to dest via the blob store and return its SHA-256.
+
+        The upload is written to a temp file while hashing. If the blob is
+        already stored the temp file is dropped and dest links the existing
+        blob; otherwise the temp file becomes the blob.
+        """
+        h = hashlib.sha256()
+        tmp = os.path.join(self.root, f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                h.update(chunk)
+                out.write(chunk)
+        digest = h.hexdigest()
+        blob = self.path_for(digest)
+
+        try:
+            with self._lock:
+                try:
+                    self._link(blob, dest)
+                    logger.debug(f"Blob {digest[:12]} reused")
+                except FileNotFoundError:
+                    # New content (or removed meanwhile by another process): publish ours
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    os.replace(tmp, blob)
+                    self._link(blob, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return digest
+
+    def _link(self, blob: str, dest: str):
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(blob, dest)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copy2(blob, dest)
+
+    def write_manifest(self, job_dir: str, digests: list):
+        with open(os.path.join(job_dir, MANIFEST_NAME), "w") as f:
+            f.write("\n".join(dict.fromkeys(digests)))
+
+    def remove_job_dir(self, job_dir: str):
+        """Delete a job directory, then any blobs it was the last user of."""
+        try:
+            with open(os.path.join(job_dir, MANIFEST_NAME)) as f:
+                digests = [line.strip() for line in f if line.strip()]
+        except OSError:
+            digests = []
+        shutil.rmtree(job_dir, ignore_errors=True)
+        with self._lock:
+            for digest in digests:
+                self._release(self.path_for(digest))
+
+    def _release(self, blob: str):
+        try:
+            if os.stat(blob).st_nlink <= 1:
+                os.remove(blob)
+        except OSError:
+            pass
+
+    def collect(self, grace_seconds: int = 300) -> int:
+        """Full sweep for unreferenced blobs and stale temp files (e.g. after a crash)."""
+        removed = 0
+        # Files this young may be mid-ingest in another process
+        cutoff = time.time() - grace_seconds
+        with self._lock:
+            for dirpath, _dirs, files in os.walk(self.root):
+                for name in files:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    if st.st_mtime < cutoff and (name.endswith(".tmp") or st.st_nlink <= 1):
+                        try:
+                            os.remove(path)
+                            removed += 1
+                        except OSError:
+                            pass
+        if removed:
+            logger.info(f"Blob store: removed {removed} unreferenced file(s)")
+        return removed
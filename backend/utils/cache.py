@@ -0,0 +1,111 @@
+"""
+Vidgo.AI - On-Disk Cache Module
+Content-addressed file cache with size-bounded LRU eviction.
+Used for artifacts that are expensive to regenerate (e.g. narration audio).
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CACHE_ROOT = os.getenv("VIDGO_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache"
+)
+
+
+def hash_key(*parts) -> str:
+    """Stable hex digest of the given parts, used as a cache key."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(repr(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def place_file(src: str, dest: str):
+    """Hardlink src to dest, falling back to a copy across filesystems."""
+    if os.path.exists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+class FileCache:
+    """
+    Directory of files named by cache key, bounded to max_bytes.
+
+    Entries are hardlinked in and out where the filesystem allows it, so a
+    hit costs no data copy. Access refreshes an entry's mtime; when the
+    directory grows past max_bytes the least recently used entries go first.
+    """
+
+    def __init__(self, name: str, max_bytes: int, suffix: str = ""):
+        self.directory = os.path.join(CACHE_ROOT, name)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def fetch(self, key: str, dest: str) -> bool:
+        """Place the cached entry at dest. Returns False on a miss."""
+        path = self.path_for(key)
+        try:
+            place_file(path, dest)
+        except (FileNotFoundError, OSError):
+            return False
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def store(self, key: str, src: str):
+        """Add src to the cache under key, then trim the cache to size."""
+        path = self.path_for(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            place_file(src, tmp)
+            os.replace(tmp, path)
+            os.utime(path)
+        except OSError as e:
+            logger.warning(f"Cache store failed for {os.path.basename(path)}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_file() or entry.name.endswith(".tmp"):
+                        continue
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            removed = 0
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    pass
+            logger.info(f"Cache {os.path.basename(self.directory)}: evicted {removed} entries, {total / 1024 / 1024:.1f} MB kept")
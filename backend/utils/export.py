@@ -0,0 +1,74 @@
+"""
+Vidgo.AI - Platform Export Module
+Produces platform-specific copies of a rendered reel, using stream copy
+whenever the source already fits the platform.
+"""
+
+import os
+import logging
+
+from utils.ffmpeg import run_ffmpeg, temp_output_path
+from utils.media import probe_video
+
+logger = logging.getLogger(__name__)
+
+
+def export_video(source_path: str, output_path: str, resolution: tuple, max_duration: float, on_progress=None) -> str:
+    """
+    Write a copy of source_path fitted to resolution and max_duration.
+
+    If the source already has the target resolution, no re-encode happens:
+    it is linked as-is when short enough, or trimmed with stream copy. Only
+    mismatched resolutions go through scale/pad and libx264.
+
+    The result is written to a temporary file and renamed into place, so a
+    partially written export is never visible at output_path.
+    """
+    w, h = resolution
+    info = probe_video(source_path)
+
+    if info and (info["width"], info["height"]) == (w, h):
+        if info["duration"] <= max_duration:
+            from utils.cache import place_file
+            temp_path = temp_output_path(output_path)
+            try:
+                place_file(source_path, temp_path)
+                os.replace(temp_path, output_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            logger.info(f"Export {os.path.basename(output_path)}: source already fits, linked")
+            return output_path
+
+        cmd = [
+            "ffmpeg", "-y", "-i", source_path,
+            "-t", str(max_duration), "-c", "copy",
+            "-movflags", "+faststart",
+        ]
+        mode = "trimmed with stream copy"
+    else:
+        cmd = [
+            "ffmpeg", "-y", "-i", source_path,
+            "-vf", f"scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:black",
+            "-c:v", "libx264", "-preset", "fast", "-crf", "23",
+            "-c:a", "aac", "-b:a", "128k",
+            "-t", str(max_duration),
+            "-movflags", "+faststart",
+        ]
+        mode = "re-encoded"
+
+    temp_path = temp_output_path(output_path)
+    cmd.append(temp_path)
+    duration = min(info["duration"], max_duration) if info else max_duration
+    try:
+        result = run_ffmpeg(cmd, duration, on_progress, timeout=300)
+        if result.returncode != 0:
+            logger.error(f"Export error: {result.stderr}")
+            raise Exception("Export encoding failed")
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    logger.info(f"Export {os.path.basename(output_path)}: {mode}")
+    return output_path
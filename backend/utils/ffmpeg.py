@@ -0,0 +1,115 @@
+"""
+Vidgo.AI - FFmpeg Runner Module
+Runs FFmpeg with `-progress pipe:1` and reports encode position, speed and
+ETA while it works.
+"""
+
+import os
+import time
+import logging
+import tempfile
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class FFmpegCancelled(Exception):
+    """Raised when an FFmpeg run is stopped through its cancel event."""
+
+
+def temp_output_path(path: str) -> str:
+    """
+    Fresh temp file next to path (same extension) to write into before an
+    atomic rename, unique so concurrent writers of one output never collide.
+    """
+    stem, ext = os.path.splitext(os.path.basename(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f"{stem}.", suffix=f".partial{ext}", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    return temp_path
+
+
+def run_ffmpeg(cmd: list, duration: float = None, on_progress=None, timeout: float = 300,
+               cancel_event: threading.Event = None) -> subprocess.CompletedProcess:
+    """
+    Run an FFmpeg command, optionally streaming progress.
+
+    Args:
+        cmd: Full command line, starting with "ffmpeg"
+        duration: Expected output duration in seconds (needed for fraction/ETA)
+        on_progress: Callback(fraction, speed, eta_seconds); speed is x realtime
+            and eta_seconds is None until FFmpeg reports a usable speed
+        timeout: Wall-clock limit; raises subprocess.TimeoutExpired when hit
+        cancel_event: When set, FFmpeg is killed and FFmpegCancelled is raised
+
+    Returns:
+        CompletedProcess with returncode and stderr text, like subprocess.run
+    """
+    if cancel_event is None and (on_progress is None or not duration):
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if cancel_event is not None and cancel_event.is_set():
+        raise FFmpegCancelled()
+
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    # Drain stderr on the side so a chatty FFmpeg can't block on a full pipe
+    stderr_lines = []
+    drain = threading.Thread(target=lambda: stderr_lines.extend(proc.stderr), daemon=True)
+    drain.start()
+
+    deadline = time.monotonic() + timeout
+    timer = threading.Timer(timeout, proc.kill)
+    timer.start()
+    if cancel_event is not None:
+        def watch_cancel():
+            while proc.poll() is None:
+                if cancel_event.wait(0.5):
+                    proc.kill()
+                    return
+        threading.Thread(target=watch_cancel, daemon=True).start()
+    try:
+        block = {}
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            if key != "progress":
+                block[key] = value
+                continue
+            # One "progress=continue|end" line closes each report block
+            fraction, speed, eta = parse_progress(block, duration) if duration else (None, None, None)
+            if fraction is not None and on_progress is not None:
+                try:
+                    on_progress(fraction, speed, eta)
+                except Exception as e:
+                    logger.debug(f"Progress callback error: {e}")
+            block = {}
+        proc.wait()
+    finally:
+        timer.cancel()
+        drain.join(timeout=5)
+
+    if proc.returncode != 0 and cancel_event is not None and cancel_event.is_set():
+        raise FFmpegCancelled()
+    if proc.returncode != 0 and time.monotonic() >= deadline:
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout="", stderr="".join(stderr_lines))
+
+
+def parse_progress(block: dict, duration: float) -> tuple:
+    """Turn one -progress report block into (fraction, speed, eta_seconds)."""
+    # out_time_us and out_time_ms both carry microseconds (the latter is misnamed)
+    raw = block.get("out_time_us") or block.get("out_time_ms")
+    try:
+        out_time = int(raw) / 1_000_000
+    except (TypeError, ValueError):
+        return None, None, None
+    fraction = max(0.0, min(1.0, out_time / duration))
+
+    try:
+        speed = float(block.get("speed", "").rstrip("x"))
+    except ValueError:
+        speed = None
+    eta = (duration - out_time) / speed if speed else None
+    if eta is not None:
+        eta = max(0.0, eta)
+    return fraction, speed, eta
@@ -0,0 +1,159 @@
+"""
+Vidgo.AI - Image Preprocessing Module
+Decodes, EXIF-rotates and downsizes uploaded photos in parallel so the
+FFmpeg render starts from small, uniform frames, and shrinks photos sent
+to the script model to a bounded size.
+"""
+
+import io
+import os
+import math
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+PREP_WORKERS = int(os.getenv("IMAGE_PREP_WORKERS", "0")) or (os.cpu_count() or 2)
+PREP_JPEG_QUALITY = 92
+
+# Images for the script model: the long edge and encoded size are capped
+MODEL_IMAGE_LONG_EDGE = int(os.getenv("SCRIPT_IMAGE_LONG_EDGE", "768"))
+MODEL_IMAGE_MAX_BYTES = int(os.getenv("SCRIPT_IMAGE_MAX_KB", "200")) * 1024
+MODEL_JPEG_QUALITIES = (85, 75, 65, 50)
+MODEL_PASSTHROUGH_MIMES = {"image/jpeg", "image/png", "image/webp"}
+
+
+def prepare_images(image_paths: list, size: tuple, output_dir: str) -> list:
+    """
+    Normalize every image to exactly `size` (cover-crop) as a baseline JPEG.
+
+    JPEGs are decoded at reduced scale where possible (libjpeg DCT scaling),
+    EXIF orientation is applied, and work is spread over a thread pool
+    (Pillow releases the GIL while decoding and resampling).
+
+    Args:
+        image_paths: Source image paths, in reel order
+        size: Target (width, height) the Ken Burns stage works at
+        output_dir: Directory for the normalized frames
+
+    Returns:
+        List of paths in the same order. If Pillow is unavailable or an
+        image can't be decoded, the original path is kept for that image
+        and FFmpeg scales it as before.
+    """
+    try:
+        from PIL import Image  # noqa: F401
+    except ImportError:
+        logger.warning("Pillow not installed; skipping image pre-normalization")
+        return list(image_paths)
+
+    os.makedirs(output_dir, exist_ok=True)
+    targets = [os.path.join(output_dir, f"prep_{i:03d}.jpg") for i in range(len(image_paths))]
+
+    workers = max(1, min(PREP_WORKERS, len(image_paths)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda args: _prepare_one(*args, size), zip(image_paths, targets)))
+
+    prepared = sum(1 for src, out in zip(image_paths, results) if out != src)
+    logger.info(f"Pre-normalized {prepared}/{len(image_paths)} images to {size[0]}x{size[1]}")
+    return results
+
+
+def prepare_for_model(uploads: list, long_edge: int = MODEL_IMAGE_LONG_EDGE,
+                      max_bytes: int = MODEL_IMAGE_MAX_BYTES) -> list:
+    """
+    Downscale and recompress uploaded images for the script model, in parallel.
+
+    Args:
+        uploads: (data, mime_type) pairs; data is bytes or a memoryview
+        long_edge: Longest side allowed, in pixels
+        max_bytes: Encoded size each image should fit in
+
+    Returns:
+        List of {"data": bytes, "mime_type": str} in the same order. Images
+        already within bounds in a format the model accepts are passed
+        through untouched; without Pillow every image is passed through.
+    """
+    try:
+        from PIL import Image  # noqa: F401
+    except ImportError:
+        logger.warning("Pillow not installed; sending script images at full size")
+        return [{"data": data, "mime_type": mime} for data, mime in uploads]
+
+    if not uploads:
+        return []
+    workers = max(1, min(PREP_WORKERS, len(uploads)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda args: _shrink_for_model(*args, long_edge, max_bytes), uploads))
+
+    before = sum(len(data) for data, _mime in uploads)
+    after = sum(len(r["data"]) for r in results)
+    logger.info(f"Script images: {len(results)} image(s), {before // 1024} KB -> {after // 1024} KB")
+    return results
+
+
+def _shrink_for_model(data, mime: str, long_edge: int, max_bytes: int) -> dict:
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if (mime in MODEL_PASSTHROUGH_MIMES and len(data) <= max_bytes
+                    and max(img.size) <= long_edge and img.getexif().get(0x0112, 1) == 1):
+                return {"data": data, "mime_type": mime}
+            if img.format == "JPEG":
+                img.draft("RGB", (long_edge, long_edge))
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.thumbnail((long_edge, long_edge), Image.Resampling.LANCZOS)
+
+            # Step the quality down until the image fits the byte budget
+            out = io.BytesIO()
+            for quality in MODEL_JPEG_QUALITIES:
+                out.seek(0)
+                out.truncate()
+                img.save(out, "JPEG", quality=quality, optimize=True)
+                if out.tell() <= max_bytes:
+                    break
+            return {"data": out.getvalue(), "mime_type": "image/jpeg"}
+    except Exception as e:
+        logger.warning(f"Script image downscale failed ({mime}, {len(data)} bytes): {e}")
+        return {"data": data, "mime_type": mime}
+
+
+def _prepare_one(src: str, dst: str, size: tuple) -> str:
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(src) as img:
+            # Let the JPEG decoder skip detail we would throw away anyway.
+            # draft() keeps the image at least as large as the requested box,
+            # so ask for the cover size in the image's own orientation.
+            if img.format == "JPEG":
+                img.draft("RGB", _draft_box(img.size, size, img.getexif().get(0x0112, 1)))
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img = ImageOps.fit(img, size, method=Image.Resampling.LANCZOS)
+            img.save(dst, "JPEG", quality=PREP_JPEG_QUALITY)
+        return dst
+    except Exception as e:
+        logger.warning(f"Image pre-normalization failed for {os.path.basename(src)}: {e}")
+        return src
+
+
+def _draft_box(src_size: tuple, target: tuple, orientation: int = 1) -> tuple:
+    """
+    Smallest box with the source aspect ratio whose cover-crop still fills target.
+
+    draft() only reduces the DCT scale while the image stays at least this
+    large, so the box is the source scaled by what the cover-crop needs,
+    not by the target's long side. orientation is the EXIF tag; 5-8 mean
+    the image is rotated a quarter turn after decoding.
+    """
+    src_w, src_h = src_size
+    target_w, target_h = target
+    if orientation in (5, 6, 7, 8):
+        target_w, target_h = target_h, target_w
+    scale = max(target_w / src_w, target_h / src_h)
+    return (max(1, math.ceil(src_w * scale)), max(1, math.ceil(src_h * scale)))
@@ -0,0 +1,295 @@
+"""
+Vidgo.AI - Durable Job Queue Module
+FIFO queue of render jobs that survives web restarts and feeds the
+standalone render worker (python -m worker). SQLite by default, Redis
+optional for workers spread over several machines.
+
+User secrets (e.g. an ElevenLabs key) are never part of the durable
+payload: they are stored beside it and handed out by the first claim only,
+which deletes them.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE = os.getenv("JOB_QUEUE", "sqlite")  # "sqlite" or "redis"
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH") or os.path.join(
+    os.getenv("VIDGO_OUTPUT_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output"),
+    "queue.db",
+)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# A claimed job whose worker hasn't acknowledged it within this window is
+# handed out again (the worker is assumed dead)
+CLAIM_LEASE_SECONDS = int(os.getenv("JOB_CLAIM_LEASE_SECONDS", "1800"))
+# Secrets of a job nobody claims are dropped after this long (Redis only;
+# SQLite rows keep them until claimed, cancelled or acknowledged)
+SECRET_TTL_SECONDS = 86400
+
+
+class SQLiteJobQueue:
+    """
+    Job queue in an SQLite table (WAL mode).
+
+    Workers claim the oldest unclaimed row inside an IMMEDIATE transaction,
+    so two workers never get the same job. Rows are deleted on ack.
+    """
+
+    POLL_SECONDS = 1.0
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " job_id TEXT UNIQUE NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL,"
+            " claimed_by TEXT,"
+            " claimed_at REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " secrets TEXT)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(queue)")}
+        if "secrets" not in columns:
+            conn.execute("ALTER TABLE queue ADD COLUMN secrets TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_queue_claimed ON queue(claimed_at, seq)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_id: str, payload: dict, secrets: dict | None = None) -> int:
+        """
+        Add a job; returns its 1-based position among waiting jobs.
+
+        secrets are merged into the payload of the first claim and then
+        deleted; a job re-claimed after a worker crash runs without them.
+        """
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO queue (job_id, payload, enqueued_at, secrets) VALUES (?, ?, ?, ?)",
+            (job_id, json.dumps(payload), time.time(), json.dumps(secrets) if secrets else None),
+        )
+        return self.position(job_id) or 1
+
+    def claim(self, worker_id: str, timeout: float = 0) -> tuple | None:
+        """Take the oldest waiting job, polling up to timeout seconds. Returns (job_id, payload) or None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            conn = self._conn()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT job_id, payload, secrets FROM queue"
+                    " WHERE claimed_at IS NULL OR claimed_at < ?"
+                    " ORDER BY seq LIMIT 1",
+                    (now - CLAIM_LEASE_SECONDS,),
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE queue SET claimed_by = ?, claimed_at = ?, attempts = attempts + 1, secrets = NULL"
+                        " WHERE job_id = ?",
+                        (worker_id, now, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if row:
+                payload = json.loads(row[1])
+                if row[2]:
+                    payload.update(json.loads(row[2]))
+                return row[0], payload
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(self.POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+
+    def ack(self, job_id: str):
+        """Remove a finished job (successful or not) from the queue."""
+        self._conn().execute("DELETE FROM queue WHERE job_id = ?", (job_id,))
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job nobody has claimed yet. Returns True if it was removed."""
+        cur = self._conn().execute("DELETE FROM queue WHERE job_id = ? AND claimed_at IS NULL", (job_id,))
+        return cur.rowcount > 0
+
+    def position(self, job_id: str) -> int | None:
+        """1-based position among waiting jobs, 0 if claimed, None if unknown."""
+        conn = self._conn()
+        row = conn.execute("SELECT seq, claimed_at FROM queue WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None:
+            return 0
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE claimed_at IS NULL AND seq < ?", (row[0],)
+        ).fetchone()[0]
+        return ahead + 1
+
+    def depth(self) -> int:
+        """Number of jobs waiting to be claimed."""
+        return self._conn().execute("SELECT COUNT(*) FROM queue WHERE claimed_at IS NULL").fetchone()[0]
+
+
+class RedisJobQueue:
+    """
+    Job queue in Redis, for workers on several machines.
+
+    Waiting job ids live in a list, payloads in a hash; a claimed job moves
+    to a per-worker processing list, with its claim stamped in the same
+    script, until it is acknowledged.
+    Claim times are kept so that jobs of a worker that died are pushed back
+    to the front of the waiting list once CLAIM_LEASE_SECONDS have passed,
+    like the SQLite queue's lease. Secrets sit in their own expiring keys.
+    """
+
+    RECLAIM_INTERVAL_SECONDS = 60
+    CLAIM_POLL_SECONDS = 0.5
+
+    # Move one waiting job to the worker's processing list, stamp the claim and
+    # take its payload and secrets, in one step: a worker that dies between the
+    # move and the stamp would otherwise leave a job reclaim_expired can't see
+    _CLAIM_SCRIPT = """
+local job_id = redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT')
+if not job_id then
+  return false
+end
+redis.call('HSET', KEYS[3], job_id, ARGV[1])
+redis.call('HSET', KEYS[4], job_id, ARGV[2])
+local payload = redis.call('HGET', KEYS[5], job_id)
+local secrets_key = ARGV[3] .. job_id
+local secrets = redis.call('GET', secrets_key)
+redis.call('DEL', secrets_key)
+return {job_id, payload or '', secrets or ''}
+"""
+
+    # Requeue every claim older than the cutoff, atomically with respect to ack
+    _RECLAIM_SCRIPT = """
+local claimed_at = redis.call('HGETALL', KEYS[2])
+local cutoff = tonumber(ARGV[1])
+local requeued = 0
+for i = 1, #claimed_at, 2 do
+  local job_id = claimed_at[i]
+  if tonumber(claimed_at[i + 1]) < cutoff then
+    local worker = redis.call('HGET', KEYS[1], job_id)
+    if worker then
+      redis.call('LREM', ARGV[2] .. worker, 0, job_id)
+    end
+    redis.call('HDEL', KEYS[1], job_id)
+    redis.call('HDEL', KEYS[2], job_id)
+    redis.call('RPUSH', KEYS[3], job_id)
+    requeued = requeued + 1
+  end
+end
+return requeued
+"""
+
+    def __init__(self, url: str = REDIS_URL, name: str = "vidgo:jobs"):
+        try:
+            import redis
+        except ImportError:
+            raise Exception("redis package not installed. Run: pip install redis")
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._claim = self._redis.register_script(self._CLAIM_SCRIPT)
+        self._reclaim = self._redis.register_script(self._RECLAIM_SCRIPT)
+        self._last_reclaim = 0.0
+        self.name = name
+
+    def enqueue(self, job_id: str, payload: dict, secrets: dict | None = None) -> int:
+        pipe = self._redis.pipeline()
+        if secrets:
+            pipe.set(f"{self.name}:secrets:{job_id}", json.dumps(secrets), ex=SECRET_TTL_SECONDS)
+        pipe.hset(f"{self.name}:payload", job_id, json.dumps(payload))
+        pipe.lpush(f"{self.name}:waiting", job_id)
+        return pipe.execute()[-1]
+
+    def claim(self, worker_id: str, timeout: float = 0) -> tuple | None:
+        self.reclaim_expired()
+        keys = [
+            f"{self.name}:waiting", f"{self.name}:processing:{worker_id}",
+            f"{self.name}:claimed", f"{self.name}:claimed_at", f"{self.name}:payload",
+        ]
+        # Blocking commands can't run inside a script, so waiting is a poll
+        deadline = time.time() + timeout
+        while True:
+            claimed = self._claim(keys=keys, args=[worker_id, time.time(), f"{self.name}:secrets:"])
+            if claimed or time.time() >= deadline:
+                break
+            time.sleep(min(self.CLAIM_POLL_SECONDS, max(0.0, deadline - time.time())))
+        if not claimed:
+            return None
+        job_id, payload, secrets = claimed
+        payload = json.loads(payload) if payload else {}
+        if secrets:
+            payload.update(json.loads(secrets))
+        return job_id, payload
+
+    def reclaim_expired(self) -> int:
+        """Requeue jobs claimed more than CLAIM_LEASE_SECONDS ago (checked at most once a minute)."""
+        now = time.time()
+        if now - self._last_reclaim < self.RECLAIM_INTERVAL_SECONDS:
+            return 0
+        self._last_reclaim = now
+        requeued = int(self._reclaim(
+            keys=[f"{self.name}:claimed", f"{self.name}:claimed_at", f"{self.name}:waiting"],
+            args=[now - CLAIM_LEASE_SECONDS, f"{self.name}:processing:"],
+        ))
+        if requeued:
+            logger.warning(f"Job queue: requeued {requeued} job(s) whose worker stopped responding")
+        return requeued
+
+    def ack(self, job_id: str):
+        worker_id = self._redis.hget(f"{self.name}:claimed", job_id)
+        pipe = self._redis.pipeline()
+        if worker_id:
+            pipe.lrem(f"{self.name}:processing:{worker_id}", 0, job_id)
+        pipe.hdel(f"{self.name}:claimed", job_id)
+        pipe.hdel(f"{self.name}:claimed_at", job_id)
+        pipe.hdel(f"{self.name}:payload", job_id)
+        pipe.delete(f"{self.name}:secrets:{job_id}")
+        pipe.execute()
+
+    def cancel(self, job_id: str) -> bool:
+        removed = self._redis.lrem(f"{self.name}:waiting", 0, job_id)
+        if removed:
+            pipe = self._redis.pipeline()
+            pipe.hdel(f"{self.name}:payload", job_id)
+            pipe.delete(f"{self.name}:secrets:{job_id}")
+            pipe.execute()
+        return bool(removed)
+
+    def position(self, job_id: str) -> int | None:
+        if self._redis.hexists(f"{self.name}:claimed", job_id):
+            return 0
+        idx = self._redis.lpos(f"{self.name}:waiting", job_id)
+        if idx is None:
+            return None
+        # Jobs are pushed on the left and claimed from the right
+        return self._redis.llen(f"{self.name}:waiting") - idx
+
+    def depth(self) -> int:
+        return self._redis.llen(f"{self.name}:waiting")
+
+
+def create_job_queue(kind: str = JOB_QUEUE):
+    """Build the durable job queue selected by JOB_QUEUE."""
+    if kind == "redis":
+        return RedisJobQueue()
+    if kind != "sqlite":
+        logger.warning(f"Unknown JOB_QUEUE '{kind}', using SQLite queue")
+    return SQLiteJobQueue()
@@ -0,0 +1,201 @@
+"""
+Vidgo.AI - Job Store Module
+Pluggable storage for job state. The in-memory store is the default; the
+SQLite store (WAL mode) lets several web processes share job state.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+JOB_STORE = os.getenv("JOB_STORE", "memory")  # "memory" or "sqlite"
+# Jobs in these states are still being worked on and survive age-based cleanup
+BUSY_STATUSES = ("queued", "processing", "exporting")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH") or os.path.join(
+    os.getenv("VIDGO_OUTPUT_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output"),
+    "jobs.db",
+)
+
+
+class MemoryJobStore:
+    """
+    Job state in a dict guarded by one lock, for a single process.
+
+    Every job carries a "version" that increases on each update; waiters
+    block on a per-job condition until the version moves past what they saw.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._jobs: dict = {}
+        self._lock = threading.Lock()
+        self._conditions: dict = {}
+
+    def create(self, job_id: str, fields: dict):
+        with self._lock:
+            self._jobs[job_id] = {**fields, "version": 0}
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.update(fields)
+            job["version"] += 1
+            cond = self._conditions.get(job_id)
+            if cond:
+                cond.notify_all()
+            return True
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            cond = self._conditions.pop(job_id, None)
+            if cond:
+                cond.notify_all()
+
+    def delete_older_than(self, cutoff: float) -> list:
+        """Remove jobs created before cutoff that aren't busy (BUSY_STATUSES); returns their ids."""
+        with self._lock:
+            stale = [
+                jid for jid, j in self._jobs.items()
+                if j.get("created_at", 0) < cutoff and j.get("status") not in BUSY_STATUSES
+            ]
+        for jid in stale:
+            self.delete(jid)
+        return stale
+
+    def wait_for_change(self, job_id: str, seen_version: int, timeout: float) -> dict | None:
+        """Block until the job's version exceeds seen_version or timeout passes; return a snapshot."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["version"] <= seen_version:
+                cond = self._conditions.setdefault(job_id, threading.Condition(self._lock))
+                cond.wait(timeout=timeout)
+                job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+
+class SQLiteJobStore:
+    """
+    Job state in an SQLite database in WAL mode, shareable across processes.
+
+    Fields are stored as a JSON document next to indexed job_id, created_at
+    and version columns. Waiters in this process are woken directly; changes
+    made by other processes are picked up by polling.
+    """
+
+    shared = True
+    POLL_SECONDS = 0.5
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._changed = threading.Condition()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " version INTEGER NOT NULL DEFAULT 0,"
+            " data TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)")
+        conn.commit()
+        logger.info(f"Job store: SQLite at {path}")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, fields: dict):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, created_at, version, data) VALUES (?, ?, 0, ?)",
+            (job_id, fields.get("created_at", time.time()), json.dumps(fields)),
+        )
+
+    def get(self, job_id: str) -> dict | None:
+        row = self._conn().execute(
+            "SELECT data, version FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "version": row[1]}
+
+    def update(self, job_id: str, **fields) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return False
+            data = {**json.loads(row[0]), **fields}
+            data.pop("version", None)
+            conn.execute(
+                "UPDATE jobs SET data = ?, version = version + 1 WHERE job_id = ?",
+                (json.dumps(data), job_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._changed:
+            self._changed.notify_all()
+        return True
+
+    def delete(self, job_id: str):
+        self._conn().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        with self._changed:
+            self._changed.notify_all()
+
+    def delete_older_than(self, cutoff: float) -> list:
+        conn = self._conn()
+        busy = ", ".join("?" * len(BUSY_STATUSES))
+        where = f"created_at < ? AND COALESCE(json_extract(data, '$.status'), '') NOT IN ({busy})"
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stale = [r[0] for r in conn.execute(f"SELECT job_id FROM jobs WHERE {where}", (cutoff, *BUSY_STATUSES))]
+            if stale:
+                conn.execute(f"DELETE FROM jobs WHERE {where}", (cutoff, *BUSY_STATUSES))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return stale
+
+    def wait_for_change(self, job_id: str, seen_version: int, timeout: float) -> dict | None:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["version"] > seen_version or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(timeout=min(self.POLL_SECONDS, remaining))
+
+
+def create_job_store(kind: str = JOB_STORE):
+    """Build the job store selected by JOB_STORE."""
+    if kind == "sqlite":
+        return SQLiteJobStore()
+    if kind != "memory":
+        logger.warning(f"Unknown JOB_STORE '{kind}', using in-memory store")
+    return MemoryJobStore()
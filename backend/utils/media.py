@@ -0,0 +1,218 @@
+"""
+Vidgo.AI - Media Probe Module
+Durations and stream info for audio/video files. MP3 and WAV are parsed
+in pure Python; anything else goes to ffprobe. Results are memoized by
+(path, size, mtime) so a file is probed once per change.
+"""
+
+import os
+import json
+import struct
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PROBE_CACHE_SIZE = 512
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# MPEG audio Layer III tables
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG-2 / 2.5
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+_MP3_MIN_FRAMES = 3  # fewer valid frames than this is not trusted as an MP3
+
+_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# ── Public API ─────────────────────────────────────────────
+
+def probe_duration(path: str) -> float | None:
+    """Duration in seconds, or None if the file can't be read or probed."""
+    return _memoized("duration", path, _probe_duration)
+
+
+def probe_video(path: str) -> dict | None:
+    """Return {"width", "height", "duration"} for a video, or None if probing fails."""
+    return _memoized("video", path, _ffprobe_video)
+
+
+def wav_info(path: str) -> dict | None:
+    """
+    Format and data-chunk layout of a RIFF/WAVE file, or None if it isn't one.
+
+    Keys: format (WAVE_FORMAT_* tag, extensible resolved), channels,
+    sample_rate, bits, byte_rate, data_offset, data_size.
+    """
+    try:
+        with open(path, "rb") as f:
+            riff = f.read(12)
+            if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+                return None
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                chunk_id, size = struct.unpack("<4sI", header)
+                if chunk_id == b"data":
+                    data_offset = f.tell()
+                    break
+                if chunk_id == b"fmt ":
+                    fmt = f.read(size)
+                    f.seek(size & 1, os.SEEK_CUR)
+                else:
+                    f.seek(size + (size & 1), os.SEEK_CUR)
+            file_size = os.fstat(f.fileno()).st_size
+    except OSError:
+        return None
+    if not fmt or len(fmt) < 16:
+        return None
+
+    tag, channels, rate, byte_rate, _align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        tag = struct.unpack("<H", fmt[24:26])[0]
+    # Streamed WAVs may carry a placeholder size; trust the file length instead
+    data_size = min(size, file_size - data_offset)
+    return {
+        "format": tag,
+        "channels": channels,
+        "sample_rate": rate,
+        "bits": bits,
+        "byte_rate": byte_rate,
+        "data_offset": data_offset,
+        "data_size": data_size,
+    }
+
+
+def mp3_duration(path: str) -> float | None:
+    """Duration of an MPEG Layer III file by walking its frame headers."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    pos = 0
+    frames = 0
+    seconds = 0.0
+    end = len(data)
+    while pos + 4 <= end:
+        if data[pos:pos + 3] == b"ID3" and pos + 10 <= end:
+            # ID3v2 tag (at the start, or left between concatenated files)
+            size = (data[pos + 6] << 21) | (data[pos + 7] << 14) | (data[pos + 8] << 7) | data[pos + 9]
+            footer = 10 if data[pos + 5] & 0x10 else 0
+            pos += 10 + size + footer
+            continue
+        if data[pos:pos + 3] == b"TAG":  # ID3v1 trailer
+            break
+        frame = _mp3_frame(data, pos)
+        if frame is None:
+            if frames == 0 and pos > 65536:
+                return None  # no MPEG audio near the start: not an MP3 after all
+            pos += 1  # resync
+            continue
+        length, samples, rate = frame
+        if frames == 0 and (b"Xing" in data[pos:pos + 48] or b"Info" in data[pos:pos + 48]):
+            pass  # VBR/encoder info frame carries no audio
+        else:
+            seconds += samples / rate
+        frames += 1
+        pos += length
+
+    return seconds if frames >= _MP3_MIN_FRAMES else None
+
+
+# ── Internals ──────────────────────────────────────────────
+
+def _mp3_frame(data: bytes, pos: int):
+    """(frame_length, samples, sample_rate) of a Layer III frame header at pos, else None."""
+    b1, b2 = data[pos + 1], data[pos + 2]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = (b1 >> 3) & 3       # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = (b1 >> 1) & 3         # 1 = Layer III
+    bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+    bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_idx] * 1000
+    rate = _MP3_SAMPLE_RATES[version][rate_idx]
+    padding = (b2 >> 1) & 1
+    if version == 3:
+        return 144 * bitrate // rate + padding, 1152, rate
+    return 72 * bitrate // rate + padding, 576, rate
+
+
+def _probe_duration(path: str) -> float | None:
+    ext = os.path.splitext(path)[1].lower()
+    duration = None
+    if ext == ".wav":
+        info = wav_info(path)
+        if info and info["byte_rate"]:
+            duration = info["data_size"] / info["byte_rate"]
+    elif ext == ".mp3":
+        duration = mp3_duration(path)
+    if duration is None:
+        duration = _ffprobe_duration(path)
+    return duration
+
+
+def _ffprobe_duration(path: str) -> float | None:
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", path],
+            capture_output=True, text=True, timeout=10,
+        )
+        return float(result.stdout.strip())
+    except (subprocess.SubprocessError, ValueError, OSError):
+        return None
+
+
+def _ffprobe_video(path: str) -> dict | None:
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "quiet", "-select_streams", "v:0",
+                "-show_entries", "stream=width,height:format=duration",
+                "-of", "json", path,
+            ],
+            capture_output=True, text=True, timeout=10,
+        )
+        data = json.loads(result.stdout)
+        stream = data["streams"][0]
+        return {
+            "width": int(stream["width"]),
+            "height": int(stream["height"]),
+            "duration": float(data["format"]["duration"]),
+        }
+    except (subprocess.SubprocessError, ValueError, KeyError, IndexError, OSError):
+        return None
+
+
+def _memoized(kind: str, path: str, probe):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (kind, os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    value = probe(path)
+    if value is None:
+        return None  # don't remember failures; the file may still be being written
+    with _cache_lock:
+        _cache[key] = value
+        while len(_cache) > PROBE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return value
@@ -0,0 +1,150 @@
+"""
+Vidgo.AI - In-Process Audio Mixer Module
+Mixes narration with background music in NumPy: loop/trim, fade-out and
+sidechain ducking of the music under speech, written as lossless WAV.
+"""
+
+import os
+import logging
+import subprocess
+
+from utils.media import wav_info, WAVE_FORMAT_IEEE_FLOAT
+
+logger = logging.getLogger(__name__)
+
+MIX_RATE = 44100
+MIX_CHANNELS = 2
+FADE_OUT_SECONDS = 2.0
+AMIX_WEIGHT = 0.5  # amix=inputs=2 scales each input by 1/inputs
+
+# Ducking: the music drops by DUCK_DB while the narration envelope is above
+# the threshold, with attack/release smoothing so it doesn't pump
+MUSIC_DUCKING = os.getenv("MUSIC_DUCKING", "1") != "0"
+DUCK_DB = float(os.getenv("MUSIC_DUCK_DB", "-8"))
+DUCK_THRESHOLD = 0.02  # narration RMS (linear) that counts as speech
+DUCK_BLOCK_SECONDS = 0.01
+DUCK_ATTACK_SECONDS = 0.05
+DUCK_RELEASE_SECONDS = 0.4
+
+
+def numpy_available() -> bool:
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def mix_pcm(narration_path: str, music_path: str, output_path: str, music_volume: float = 0.15,
+            ducking: bool = MUSIC_DUCKING) -> str:
+    """
+    Mix narration and looped background music into a 16-bit WAV at output_path.
+
+    The mix is as long as the narration. Music is read straight from a
+    float32 WAV at MIX_RATE (the music library's normalized copy) via a
+    memory map; anything else is decoded with one FFmpeg call.
+
+    Raises an exception on failure; callers fall back to the FFmpeg mixer.
+    """
+    import numpy as np
+
+    music_volume = max(0.0, min(1.0, music_volume))
+    voice = _load_pcm(narration_path)
+    music = _load_pcm(music_path)
+    n = len(voice)
+    if n == 0 or len(music) == 0:
+        raise ValueError("empty audio input")
+
+    # Loop and trim the music to the narration length
+    reps = -(-n // len(music))
+    bed = np.tile(music, (reps, 1))[:n] if reps > 1 else np.array(music[:n])
+    bed *= np.float32(music_volume)
+
+    if ducking:
+        bed *= _duck_gain(voice, n)[:, None]
+
+    fade = min(n, int(FADE_OUT_SECONDS * MIX_RATE))
+    if fade:
+        bed[n - fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)[:, None]
+
+    # Same gain structure as FFmpeg's amix (used by music_mix_filter): each of
+    # the two inputs is weighted 1/2, so a render sounds the same either way
+    mixed = (voice + bed) * np.float32(AMIX_WEIGHT)
+    peak = float(np.max(np.abs(mixed)))
+    if peak > 0.99:
+        mixed *= np.float32(0.99 / peak)
+
+    _write_wav16(output_path, mixed)
+    logger.info(f"Mixed audio in-process: {n / MIX_RATE:.1f}s, music_vol={music_volume}, ducking={'on' if ducking else 'off'}")
+    return output_path
+
+
+def _duck_gain(voice, n: int):
+    """Per-sample music gain from an attack/release envelope follower on the narration."""
+    import numpy as np
+
+    block = max(1, int(DUCK_BLOCK_SECONDS * MIX_RATE))
+    blocks = -(-n // block)
+    mono = np.abs(voice).mean(axis=1)
+    padded = np.zeros(blocks * block, dtype=np.float32)
+    padded[:n] = mono
+    rms = np.sqrt(np.mean(np.square(padded.reshape(blocks, block)), axis=1))
+
+    # One-pole smoothing per 10 ms block: a few thousand steps for a minute of audio
+    target = np.where(rms > DUCK_THRESHOLD, 10 ** (DUCK_DB / 20), 1.0)
+    attack = 1 - np.exp(-DUCK_BLOCK_SECONDS / DUCK_ATTACK_SECONDS)
+    release = 1 - np.exp(-DUCK_BLOCK_SECONDS / DUCK_RELEASE_SECONDS)
+    gain = np.empty(blocks, dtype=np.float32)
+    g = 1.0
+    for i, t in enumerate(target.tolist()):
+        g += (t - g) * (attack if t < g else release)
+        gain[i] = g
+
+    centers = (np.arange(blocks) + 0.5) * block
+    return np.interp(np.arange(n), centers, gain).astype(np.float32)
+
+
+def _load_pcm(path: str):
+    """(frames, MIX_CHANNELS) float32 samples at MIX_RATE."""
+    import numpy as np
+
+    layout = _float_wav_layout(path)
+    if layout:
+        offset, size = layout
+        frames = size // (4 * MIX_CHANNELS)
+        return np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(frames, MIX_CHANNELS))
+
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", path, "-vn", "-f", "f32le",
+         "-ac", str(MIX_CHANNELS), "-ar", str(MIX_RATE), "-"],
+        capture_output=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise Exception(f"decode failed for {os.path.basename(path)}: {result.stderr[-300:].decode(errors='replace')}")
+    return np.frombuffer(result.stdout, dtype="<f4").reshape(-1, MIX_CHANNELS).copy()
+
+
+def _float_wav_layout(path: str):
+    """(offset, size) of the data chunk if path is a float32 WAV in the mix format, else None."""
+    if not path.lower().endswith(".wav"):
+        return None
+    info = wav_info(path)
+    if not info or (info["format"], info["channels"], info["sample_rate"], info["bits"]) != (
+        WAVE_FORMAT_IEEE_FLOAT, MIX_CHANNELS, MIX_RATE, 32,
+    ):
+        return None
+    return info["data_offset"], info["data_size"]
+
+
+def _write_wav16(path: str, samples):
+    import numpy as np
+    import wave
+
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    tmp = f"{path}.tmp"
+    with wave.open(tmp, "wb") as w:
+        w.setnchannels(MIX_CHANNELS)
+        w.setsampwidth(2)
+        w.setframerate(MIX_RATE)
+        w.writeframes(pcm.tobytes())
+    os.replace(tmp, path)
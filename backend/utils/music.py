@@ -0,0 +1,256 @@
+"""
+Vidgo.AI - Music Library Module
+Indexes the background music folder once (and again when it changes):
+real duration, integrated loudness and sample rate per track, plus a
+pre-decoded, loudness-normalized float PCM copy ready for mixing.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import subprocess
+import threading
+
+from utils.cache import CACHE_ROOT, hash_key
+from utils.media import wav_info
+
+logger = logging.getLogger(__name__)
+
+MUSIC_EXTENSIONS = {".mp3", ".wav", ".m4a", ".aac", ".ogg", ".flac"}
+MUSIC_TARGET_LUFS = float(os.getenv("MUSIC_TARGET_LUFS", "-16"))
+MUSIC_PCM_RATE = 44100
+MUSIC_PCM_CHANNELS = 2
+MUSIC_RESCAN_SECONDS = int(os.getenv("MUSIC_RESCAN_SECONDS", "30"))
+MUSIC_CACHE_DIR = os.path.join(CACHE_ROOT, "music")
+
+_LOUDNESS_RE = re.compile(r"I:\s+(-?[\d.]+|-inf) LUFS")
+_SAMPLE_RATE_RE = re.compile(r"Audio: .*?(\d+) Hz")
+
+
+class MusicLibrary:
+    """
+    In-memory index of one music folder, persisted next to the PCM copies.
+
+    Each entry: file, size, mtime, duration, loudness_lufs, sample_rate,
+    pcm_path, pcm_offset. The PCM copy is a float32 WAV at MUSIC_PCM_RATE,
+    normalized to MUSIC_TARGET_LUFS; pcm_offset is where its samples start,
+    so callers can memory-map them directly.
+    """
+
+    def __init__(self, folder: str, cache_dir: str = MUSIC_CACHE_DIR):
+        self.folder = folder
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._tracks: dict = {}  # file name -> entry
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._index_mtime = None
+        self._failed: dict = {}  # file name -> (size, mtime) that couldn't be decoded
+        self.watching = False
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    # ── Lookup ─────────────────────────────────────────────
+
+    def get(self, file_name: str) -> dict | None:
+        if not self.watching:
+            # Another process (the web app) maintains the index; pick up its changes
+            self._load_index()
+        with self._lock:
+            entry = self._tracks.get(file_name)
+            return dict(entry) if entry else None
+
+    def tracks(self) -> dict:
+        """Snapshot of the index, keyed by file name."""
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._tracks.items()}
+
+    def pcm_path(self, file_name: str) -> str | None:
+        """Normalized PCM copy of a track, or None if it isn't indexed (yet)."""
+        entry = self.get(file_name)
+        if entry and entry.get("pcm_path") and os.path.exists(entry["pcm_path"]):
+            return entry["pcm_path"]
+        return None
+
+    # ── Scanning ───────────────────────────────────────────
+
+    def start_watcher(self):
+        """Scan now and rescan in the background whenever the folder changes."""
+        def run():
+            while True:
+                try:
+                    self.scan()
+                except Exception as e:
+                    logger.error(f"Music library scan error: {e}")
+                time.sleep(MUSIC_RESCAN_SECONDS)
+
+        threading.Thread(target=run, daemon=True, name="music-library").start()
+
+    def scan(self, force: bool = False):
+        """Index new or changed tracks and drop removed ones."""
+        with self._scan_lock:
+            try:
+                names = [n for n in os.listdir(self.folder) if os.path.splitext(n)[1].lower() in MUSIC_EXTENSIONS]
+            except OSError:
+                return
+            stats = {}
+            for name in names:
+                try:
+                    st = os.stat(os.path.join(self.folder, name))
+                except OSError:
+                    continue
+                stats[name] = (st.st_size, st.st_mtime_ns)
+
+            with self._lock:
+                known = {n: (e["size"], e["mtime"]) for n, e in self._tracks.items()}
+                known.update(self._failed)
+                if not force and known == stats:
+                    return
+                current = dict(self._tracks)
+
+            changed = False
+            for name in set(current) - set(stats):
+                self._remove_pcm(current.pop(name))
+                changed = True
+            for name, (size, mtime) in stats.items():
+                entry = current.get(name)
+                if entry and (entry["size"], entry["mtime"]) == (size, mtime) and os.path.exists(entry["pcm_path"]):
+                    continue
+                if not force and self._failed.get(name) == (size, mtime):
+                    continue
+                if entry:
+                    self._remove_pcm(entry)
+                new_entry = self._index_track(name, size, mtime)
+                if new_entry:
+                    current[name] = new_entry
+                    self._failed.pop(name, None)
+                else:
+                    current.pop(name, None)
+                    self._failed[name] = (size, mtime)
+                changed = True
+            for name in set(self._failed) - set(stats):
+                del self._failed[name]
+
+            with self._lock:
+                self._tracks = current
+            if changed:
+                self._save_index()
+                logger.info(f"Music library: {len(current)} track(s) indexed")
+
+    def _index_track(self, name: str, size: int, mtime: int) -> dict | None:
+        path = os.path.join(self.folder, name)
+        try:
+            loudness, sample_rate = _measure(path)
+            gain_db = MUSIC_TARGET_LUFS - loudness if loudness is not None else 0.0
+            pcm_path = os.path.join(self.cache_dir, f"{hash_key(name, size, mtime, MUSIC_TARGET_LUFS)}.wav")
+            _decode_normalized(path, pcm_path, gain_db)
+            info = wav_info(pcm_path)
+            if info is None:
+                raise ValueError("decoded PCM is not a readable WAV")
+        except Exception as e:
+            logger.warning(f"Music library: could not index {name}: {e}")
+            return None
+        frames = info["data_size"] // (4 * MUSIC_PCM_CHANNELS)
+        return {
+            "file": name,
+            "size": size,
+            "mtime": mtime,
+            "duration": round(frames / MUSIC_PCM_RATE, 3),
+            "loudness_lufs": round(loudness, 1) if loudness is not None else None,
+            "sample_rate": sample_rate,
+            "gain_db": round(gain_db, 2),
+            "pcm_path": pcm_path,
+            "pcm_offset": info["data_offset"],
+            "pcm_rate": MUSIC_PCM_RATE,
+            "pcm_channels": MUSIC_PCM_CHANNELS,
+        }
+
+    def _remove_pcm(self, entry: dict):
+        try:
+            os.remove(entry["pcm_path"])
+        except OSError:
+            pass
+
+    # ── Persistence ────────────────────────────────────────
+
+    def _load_index(self):
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+            if mtime == self._index_mtime:
+                return
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._index_mtime = mtime
+        if data.get("folder") != os.path.abspath(self.folder) or data.get("target_lufs") != MUSIC_TARGET_LUFS:
+            return
+        tracks = {e["file"]: e for e in data.get("tracks", []) if os.path.exists(e.get("pcm_path", ""))}
+        with self._lock:
+            self._tracks = tracks
+
+    def _save_index(self):
+        data = {
+            "folder": os.path.abspath(self.folder),
+            "target_lufs": MUSIC_TARGET_LUFS,
+            "tracks": list(self.tracks().values()),
+        }
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            logger.warning(f"Music library: could not save index: {e}")
+
+
+# ── FFmpeg helpers ─────────────────────────────────────────
+
+def _measure(path: str) -> tuple:
+    """Integrated loudness (LUFS, None if silent) and source sample rate via the ebur128 filter."""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", path, "-af", "ebur128=framelog=quiet", "-f", "null", "-"],
+        capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise Exception(f"loudness scan failed: {result.stderr[-300:]}")
+    matches = _LOUDNESS_RE.findall(result.stderr)
+    loudness = float(matches[-1]) if matches and matches[-1] != "-inf" else None
+    rate = _SAMPLE_RATE_RE.search(result.stderr)
+    return loudness, int(rate.group(1)) if rate else None
+
+
+def _decode_normalized(path: str, pcm_path: str, gain_db: float):
+    tmp = f"{pcm_path}.{os.getpid()}.tmp.wav"
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner", "-i", path, "-vn", "-map_metadata", "-1", "-fflags", "+bitexact",
+         "-af", f"volume={gain_db:.2f}dB", "-ar", str(MUSIC_PCM_RATE), "-ac", str(MUSIC_PCM_CHANNELS),
+         "-c:a", "pcm_f32le", tmp],
+        capture_output=True, text=True, timeout=300,
+    )
+    if result.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise Exception(f"decode failed: {result.stderr[-300:]}")
+    os.replace(tmp, pcm_path)
+
+
+# ── Shared instances ───────────────────────────────────────
+
+_libraries: dict = {}
+_libraries_lock = threading.Lock()
+
+
+def get_music_library(folder: str, watch: bool = False) -> MusicLibrary:
+    """Per-process library for folder; watch=True starts the background rescanner once."""
+    folder = os.path.abspath(folder)
+    with _libraries_lock:
+        library = _libraries.get(folder)
+        if library is None:
+            library = _libraries[folder] = MusicLibrary(folder)
+        if watch and not library.watching:
+            library.watching = True
+            library.start_watcher()
+        return library
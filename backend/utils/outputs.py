@@ -0,0 +1,233 @@
+"""
+Vidgo.AI - Output Storage Index Module
+Tracks job output directories by expiry time, last access and size so
+cleanup touches only what has expired and disk usage can be capped.
+"""
+
+import os
+import re
+import time
+import heapq
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+OUTPUT_QUOTA_MB = int(os.getenv("OUTPUT_QUOTA_MB", "0"))  # 0 = no byte quota
+DISK_HIGH_WATER_PERCENT = float(os.getenv("DISK_HIGH_WATER_PERCENT", "0"))  # 0 = no disk check
+EVICT_TARGET_RATIO = 0.9  # Evict down to 90% of the limit to avoid thrashing
+# Jobs finished or accessed this recently are never evicted
+EVICT_GRACE_SECONDS = int(os.getenv("EVICT_GRACE_SECONDS", "600"))
+
+_JOB_DIR_PATTERN = re.compile(r"^[0-9]{8}_[0-9]{6}_[a-f0-9]{8}$")
+
+
+def dir_size(path: str) -> int:
+    """Total size in bytes of the regular files under path."""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            pass
+    return total
+
+
+class OutputIndex:
+    """
+    Expiry heap plus per-job bookkeeping for the output folder.
+
+    Jobs are registered when created; `pop_expired` then costs O(expired)
+    instead of a directory scan. Sizes are measured while a job is
+    "unsettled" (still being written) and frozen once it finishes, keeping
+    a running total for the quota check.
+    """
+
+    def __init__(self, root: str, ttl_seconds: int = JOB_TTL_SECONDS, remove_dir=None):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.remove_dir = remove_dir or (lambda path: shutil.rmtree(path, ignore_errors=True))
+        self._heap: list = []  # (expires_at, job_id)
+        self._jobs: dict = {}  # job_id -> {expires_at, last_access, bytes, settled}
+        self._total_bytes = 0
+        self._disk_warned_at = 0.0
+        self._lock = threading.Lock()
+
+    # ── Registration and access ────────────────────────────
+
+    def add(self, job_id: str, created_at: float, last_access: float = None, settled: bool = False):
+        with self._lock:
+            if job_id in self._jobs:
+                return
+            expires_at = created_at + self.ttl_seconds
+            self._jobs[job_id] = {
+                "expires_at": expires_at,
+                "last_access": last_access or created_at,
+                "settled_at": created_at,
+                "bytes": 0,
+                "settled": settled,
+            }
+            heapq.heappush(self._heap, (expires_at, job_id))
+
+    def rebuild_from_disk(self):
+        """One-time scan at startup to pick up jobs left by an earlier run."""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            if not _JOB_DIR_PATTERN.match(name):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            self.add(name, mtime)
+        logger.info(f"Output index: {len(self._jobs)} existing job(s) registered")
+
+    def touch(self, job_id: str, now: float):
+        """Record an access (download, stream, ...) for LRU eviction."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry:
+                entry["last_access"] = now
+
+    def mark_unsettled(self, job_id: str):
+        """Flag a job whose files are changing (e.g. a new export) for re-measuring."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry:
+                entry["settled"] = False
+
+    def measure(self, is_finished):
+        """Re-measure unsettled jobs; those for which is_finished(job_id) is true become settled."""
+        with self._lock:
+            pending = [jid for jid, e in self._jobs.items() if not e["settled"]]
+        for job_id in pending:
+            size = dir_size(os.path.join(self.root, job_id))
+            finished = is_finished(job_id)
+            with self._lock:
+                entry = self._jobs.get(job_id)
+                if entry is None:
+                    continue
+                self._total_bytes += size - entry["bytes"]
+                entry["bytes"] = size
+                if finished:
+                    entry["settled_at"] = time.time()
+                entry["settled"] = finished
+
+    # ── Removal ────────────────────────────────────────────
+
+    def pop_expired(self, now: float) -> list:
+        """Remove and return job ids whose expiry time has passed."""
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, job_id = heapq.heappop(self._heap)
+                entry = self._jobs.get(job_id)
+                # Skip heap entries left behind by an eviction
+                if entry is None or entry["expires_at"] != expires_at:
+                    continue
+                self._forget_locked(job_id)
+                expired.append(job_id)
+        return expired
+
+    def pop_over_quota(self, is_busy) -> list:
+        """
+        Remove and return least-recently-accessed jobs until usage is under the limits.
+
+        Only settled jobs outside the grace period are candidates. The disk
+        high-water mark counts the whole volume, so it is only acted on when
+        evicting the candidates could actually bring usage under it;
+        otherwise other data is filling the disk and deleting reels won't help.
+        """
+        now = time.time()
+        with self._lock:
+            candidates = sorted(
+                (e["last_access"], e["bytes"], jid) for jid, e in self._jobs.items()
+                if e["settled"] and max(e["last_access"], e["settled_at"]) < now - EVICT_GRACE_SECONDS
+            )
+            total = self._total_bytes
+        evictable = sum(size for _last_access, size, _jid in candidates)
+
+        need = 0
+        if OUTPUT_QUOTA_MB and total > OUTPUT_QUOTA_MB * 1024 * 1024:
+            need = total - OUTPUT_QUOTA_MB * 1024 * 1024 * EVICT_TARGET_RATIO
+        disk_need = self._disk_bytes_over()
+        if disk_need > evictable:
+            if now - self._disk_warned_at > 600:
+                self._disk_warned_at = now
+                logger.warning(
+                    f"Disk above {DISK_HIGH_WATER_PERCENT}% but outputs can only free "
+                    f"{evictable / 1024 / 1024:.0f} MB of {disk_need / 1024 / 1024:.0f} MB; not evicting for disk"
+                )
+        elif disk_need > need:
+            need = disk_need
+        if need <= 0:
+            return []
+
+        evicted = []
+        for _last_access, size, job_id in candidates:
+            if need <= 0:
+                break
+            if is_busy(job_id):
+                continue
+            with self._lock:
+                if job_id not in self._jobs:
+                    continue
+                self._forget_locked(job_id)
+            self.remove_dir(os.path.join(self.root, job_id))
+            evicted.append(job_id)
+            need -= size
+        if evicted:
+            logger.warning(f"Output quota: evicted {len(evicted)} least recently used job(s)")
+        return evicted
+
+    def _forget_locked(self, job_id: str):
+        entry = self._jobs.pop(job_id)
+        self._total_bytes -= entry["bytes"]
+
+    def _disk_bytes_over(self) -> float:
+        """Bytes to free to get the volume back under the high-water target, 0 if it isn't over."""
+        if not DISK_HIGH_WATER_PERCENT:
+            return 0
+        try:
+            usage = shutil.disk_usage(self.root)
+        except OSError:
+            return 0
+        if usage.used / usage.total * 100 <= DISK_HIGH_WATER_PERCENT:
+            return 0
+        return usage.used - usage.total * DISK_HIGH_WATER_PERCENT / 100 * EVICT_TARGET_RATIO
+
+    # ── Reporting ──────────────────────────────────────────
+
+    def stats(self, top: int = 0) -> dict:
+        """Totals for operators, plus the `top` largest jobs if requested."""
+        with self._lock:
+            summary = {
+                "jobs": len(self._jobs),
+                "bytes": self._total_bytes,
+                "quota_bytes": OUTPUT_QUOTA_MB * 1024 * 1024 or None,
+                "disk_high_water_percent": DISK_HIGH_WATER_PERCENT or None,
+            }
+            if top:
+                largest = sorted(self._jobs.items(), key=lambda kv: kv[1]["bytes"], reverse=True)[:top]
+                summary["largest"] = [
+                    {"job_id": jid, "bytes": e["bytes"], "last_access": e["last_access"], "expires_at": e["expires_at"]}
+                    for jid, e in largest
+                ]
+        try:
+            usage = shutil.disk_usage(self.root)
+            summary["disk_used_percent"] = round(usage.used / usage.total * 100, 1)
+        except OSError:
+            pass
+        return summary
@@ -0,0 +1,181 @@
+"""
+Vidgo.AI - Render Pipeline Module
+The TTS → mix → create_reel → create_thumbnail pipeline for one job.
+Shared by the in-process scheduler and the standalone render worker.
+"""
+
+import os
+import time
+import logging
+import threading
+
+from utils.tts import synthesize_speech
+from utils.video import create_reel, create_thumbnail
+from utils.ffmpeg import FFmpegCancelled
+from utils.music import get_music_library
+from utils.audio import in_process_mixing
+from utils.mixer import mix_pcm
+
+logger = logging.getLogger(__name__)
+
+CANCEL_POLL_SECONDS = 1.0
+
+
+def progress_reporter(job_store, job_id: str, start: int, end: int, message: str):
+    """Map an FFmpeg progress callback onto the job's [start, end] progress range."""
+    def report(fraction, speed, eta):
+        job_store.update(
+            job_id,
+            progress=start + int((end - start) * fraction),
+            message=message,
+            eta_seconds=round(eta) if eta is not None else None,
+            encode_speed=round(speed, 2) if speed else None,
+        )
+    return report
+
+
+def watch_remote_cancel(job_store, job_id: str, cancel_event: threading.Event):
+    """Relay a cancel request recorded in a shared job store to this process's render."""
+    def watch():
+        while not cancel_event.is_set():
+            job = job_store.get(job_id)
+            if job is None or job["status"] not in ("queued", "processing"):
+                return
+            if job.get("cancel_requested"):
+                cancel_event.set()
+                return
+            time.sleep(CANCEL_POLL_SECONDS)
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def run_render_job(job_store, job_id: str, params: dict, output_folder: str, music_folder: str,
+                   cancel_event: threading.Event = None):
+    """
+    Render one job and record its progress and outcome in job_store.
+
+    params is the JSON-serializable job description built by /api/generate.
+    File references in it are names relative to the job directory (images)
+    and the music folder, so a worker on another machine can resolve them
+    against its own mount of the shared directories.
+    """
+    cancel_event = cancel_event or threading.Event()
+    job_dir = os.path.join(output_folder, job_id)
+
+    if cancel_event.is_set():
+        job_store.update(job_id, status="cancelled", message="Render cancelled")
+        return
+    if job_store.shared:
+        watch_remote_cancel(job_store, job_id, cancel_event)
+
+    def update_job(**kwargs):
+        job_store.update(job_id, **kwargs)
+
+    image_paths = [os.path.join(job_dir, name) for name in params["images"]]
+    platforms = params.get("platforms") or {}
+    api_key = params.get("api_key") or os.getenv("ELEVENLABS_API_KEY", "")
+
+    try:
+        update_job(status="processing", progress=20, message="Generating narration...")
+
+        # Synthesize narration
+        audio_path = os.path.join(job_dir, "narration.mp3")
+        synthesize_speech(
+            text=params["script"], output_path=audio_path, api_key=api_key or None,
+            voice_id=params["voice_id"], speech_speed=params["speech_speed"],
+        )
+
+        # Background music: handed to create_reel and mixed inside the video
+        # render, unless the NumPy premix is enabled for ducking (AUDIO_MIXER=numpy)
+        final_audio = audio_path
+        music_path = None
+        if params.get("music_file"):
+            # Prefer the library's pre-decoded, loudness-normalized copy
+            music_path = (
+                get_music_library(music_folder).pcm_path(params["music_file"])
+                or os.path.join(music_folder, params["music_file"])
+            )
+            if not os.path.exists(music_path):
+                logger.warning(f"Job {job_id}: music file {params['music_file']} not found, using narration only")
+                music_path = None
+            elif in_process_mixing():
+                update_job(progress=40, message="Mixing audio...")
+                try:
+                    final_audio = mix_pcm(
+                        audio_path, music_path, os.path.join(job_dir, "mixed_audio.wav"), params["music_volume"],
+                    )
+                    music_path = None
+                except Exception as e:
+                    logger.warning(f"Job {job_id}: in-process mix failed ({e}); mixing during the render")
+
+        update_job(progress=55, message="Creating video with transitions...", eta_seconds=None, encode_speed=None)
+
+        # Generate video
+        output_video = os.path.join(job_dir, "reel.mp4")
+        create_reel(
+            image_paths=image_paths,
+            audio_path=final_audio,
+            music_path=music_path,
+            music_volume=params.get("music_volume", 0.15),
+            output_path=output_video,
+            transition=params["transition"],
+            transition_duration=params["transition_duration"],
+            resolution=tuple(params["resolution"]),
+            duration_per_image=params.get("duration_per_image"),
+            title_text=params.get("title_text", ""),
+            title_position=params.get("title_position", "top"),
+            on_progress=progress_reporter(job_store, job_id, 55, 85, "Creating video with transitions..."),
+            preview_path=os.path.join(job_dir, "preview.mp4"),
+            on_preview=lambda _path: update_job(
+                message="Preview ready. Rendering full quality...",
+                result={"job_id": job_id, "preview_url": f"/api/preview/{job_id}"},
+            ),
+            cancel_event=cancel_event,
+            image_keys=params.get("image_hashes"),
+            variants=[
+                {
+                    "path": os.path.join(job_dir, f"reel_{p}.mp4"),
+                    "resolution": tuple(settings["resolution"]),
+                    "max_duration": settings["max_duration"],
+                }
+                for p, settings in platforms.items()
+            ],
+        )
+
+        update_job(progress=85, message="Generating thumbnail...", eta_seconds=None, encode_speed=None)
+
+        # Generate thumbnail
+        thumbnail_path = os.path.join(job_dir, "thumbnail.jpg")
+        create_thumbnail(output_video, thumbnail_path)
+
+        video_size = os.path.getsize(output_video) / (1024 * 1024)
+        tts_used = "ElevenLabs" if api_key else "Google TTS"
+
+        update_job(
+            status="done",
+            progress=100,
+            message="Reel generated successfully!",
+            result={
+                "job_id": job_id,
+                "video_url": f"/api/stream/{job_id}",
+                "preview_url": f"/api/preview/{job_id}" if os.path.exists(os.path.join(job_dir, "preview.mp4")) else None,
+                "download_url": f"/api/download/{job_id}",
+                "thumbnail_url": f"/api/thumbnail/{job_id}",
+                "video_size_mb": round(video_size, 2),
+                "num_images": len(image_paths),
+                "tts_engine": tts_used,
+                "exports": {
+                    p: f"/api/export/{job_id}/{p}"
+                    for p in platforms
+                    if os.path.exists(os.path.join(job_dir, f"reel_{p}.mp4"))
+                },
+            },
+        )
+        logger.info(f"Job {job_id}: Done ({video_size:.1f} MB)")
+
+    except FFmpegCancelled:
+        logger.info(f"Job {job_id}: Cancelled during render")
+        update_job(status="cancelled", message="Render cancelled", eta_seconds=None, encode_speed=None)
+    except Exception as e:
+        logger.error(f"Job {job_id} error: {e}", exc_info=True)
+        update_job(status="error", progress=0, message=str(e), error=str(e))
@@ -0,0 +1,202 @@
+"""
+Vidgo.AI - Rate Limiter Module
+Token-bucket rate limiting per client. Each key holds up to `burst` tokens
+that refill at `rate` tokens per second; a request spends tokens according
+to its cost. In-memory by default, SQLite or Redis to share the buckets
+between web processes.
+"""
+
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")  # "memory", "sqlite" or "redis"
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "15"))
+RATE_LIMIT_REFILL_PER_SEC = float(os.getenv("RATE_LIMIT_REFILL_PER_SEC", "0.1"))
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH") or os.path.join(
+    os.getenv("VIDGO_OUTPUT_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output"),
+    "ratelimit.db",
+)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SWEEP_SECONDS = 60
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+class _BucketConfig:
+    def __init__(self, burst: float, rate: float):
+        self.burst = burst
+        self.rate = rate
+        # A bucket idle this long is full again, so forgetting it changes nothing
+        self.idle_seconds = burst / rate if rate > 0 else 86400
+
+    def _cost(self, cost: float) -> float:
+        # A request dearer than the whole bucket could never pass; cap it
+        return min(cost, self.burst)
+
+    def _retry_after(self, tokens: float, cost: float) -> int:
+        if self.rate <= 0:
+            return int(self.idle_seconds)
+        return max(1, math.ceil((cost - tokens) / self.rate))
+
+
+class MemoryRateLimiter(_BucketConfig):
+    """
+    Buckets in an OrderedDict kept in last-used order, for a single process.
+
+    Idle keys sit at the front, so eviction pops from there and stops at the
+    first key still in use.
+    """
+
+    def __init__(self, burst: float = RATE_LIMIT_BURST, rate: float = RATE_LIMIT_REFILL_PER_SEC):
+        super().__init__(burst, rate)
+        self._buckets: OrderedDict = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float = 1.0) -> tuple:
+        """Spend cost tokens from key's bucket. Returns (allowed, retry_after_seconds)."""
+        cost = self._cost(cost)
+        now = time.time()
+        with self._lock:
+            self._evict_idle_locked(now)
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = _refill(tokens, updated, now, self.rate, self.burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+        return allowed, 0 if allowed else self._retry_after(tokens, cost)
+
+    def _evict_idle_locked(self, now: float):
+        while self._buckets:
+            key, (_tokens, updated) = next(iter(self._buckets.items()))
+            if now - updated < self.idle_seconds:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteRateLimiter(_BucketConfig):
+    """
+    Buckets in an SQLite table (WAL mode), shared by processes on one host.
+
+    Each take is one IMMEDIATE transaction; idle rows are deleted through the
+    index on `updated` at most once a minute.
+    """
+
+    def __init__(self, burst: float = RATE_LIMIT_BURST, rate: float = RATE_LIMIT_REFILL_PER_SEC,
+                 path: str = RATE_LIMIT_DB_PATH):
+        super().__init__(burst, rate)
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_updated ON buckets(updated)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, cost: float = 1.0) -> tuple:
+        cost = self._cost(cost)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(*row, now, self.rate, self.burst) if row else self.burst
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            if now - self._last_sweep > SWEEP_SECONDS:
+                self._last_sweep = now
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_seconds,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, 0 if allowed else self._retry_after(tokens, cost)
+
+
+class RedisRateLimiter(_BucketConfig):
+    """
+    Buckets in Redis hashes, updated atomically by a Lua script; Redis
+    expires idle keys itself.
+    """
+
+    _SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], ttl)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, burst: float = RATE_LIMIT_BURST, rate: float = RATE_LIMIT_REFILL_PER_SEC,
+                 url: str = REDIS_URL, prefix: str = "vidgo:ratelimit"):
+        super().__init__(burst, rate)
+        try:
+            import redis
+        except ImportError:
+            raise Exception("redis package not installed. Run: pip install redis")
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._take = self._redis.register_script(self._SCRIPT)
+        self.prefix = prefix
+
+    def take(self, key: str, cost: float = 1.0) -> tuple:
+        cost = self._cost(cost)
+        allowed, tokens = self._take(
+            keys=[f"{self.prefix}:{key}"],
+            args=[self.burst, self.rate, time.time(), cost, math.ceil(self.idle_seconds)],
+        )
+        allowed = bool(int(allowed))
+        return allowed, 0 if allowed else self._retry_after(float(tokens), cost)
+
+
+def create_rate_limiter(kind: str = RATE_LIMIT_STORE):
+    """Build the rate limiter selected by RATE_LIMIT_STORE."""
+    if kind == "sqlite":
+        return SQLiteRateLimiter()
+    if kind == "redis":
+        return RedisRateLimiter()
+    if kind != "memory":
+        logger.warning(f"Unknown RATE_LIMIT_STORE '{kind}', using in-memory limiter")
+    return MemoryRateLimiter()
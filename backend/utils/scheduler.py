@@ -0,0 +1,145 @@
+"""
+Vidgo.AI - Render Scheduler Module
+Fixed-size worker pool with a bounded FIFO queue for render jobs.
+Keeps concurrent FFmpeg graphs at a level the machine can sustain.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def _default_workers() -> int:
+    # libx264 already spreads one encode over several cores, so running one
+    # render per core oversubscribes the CPU. Half the cores is the sweet spot.
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0")) or _default_workers()
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", str(RENDER_WORKERS * 8)))
+DEFAULT_JOB_SECONDS = 60.0  # Initial guess until real job durations are observed
+
+
+class QueueFullError(Exception):
+    """Raised when the render queue has no free slot."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Render queue is full")
+        self.retry_after = retry_after
+
+
+class RenderScheduler:
+    """
+    Run callables on a fixed pool of worker threads, in submission order.
+
+    Jobs wait in a bounded FIFO queue; `submit` raises QueueFullError once
+    the queue holds `max_queue` pending jobs. The average job duration is
+    tracked so callers can report an estimated wait to users.
+    """
+
+    def __init__(self, workers: int = RENDER_WORKERS, max_queue: int = RENDER_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._queue: deque = deque()
+        self._running: dict = {}  # job_id -> start time
+        self._avg_seconds = DEFAULT_JOB_SECONDS
+        self._cond = threading.Condition()
+
+        for n in range(self.workers):
+            threading.Thread(target=self._worker, name=f"render-worker-{n}", daemon=True).start()
+        logger.info(f"Render scheduler: {self.workers} worker(s), queue size {self.max_queue}")
+
+    def submit(self, job_id: str, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for execution. Raises QueueFullError when full."""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError(self._retry_after_locked())
+            self._queue.append((job_id, fn, args, kwargs))
+            self._cond.notify()
+            return len(self._queue)
+
+    def position(self, job_id: str) -> int | None:
+        """1-based queue position, 0 if running, None if unknown to the scheduler."""
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            for i, (jid, *_rest) in enumerate(self._queue):
+                if jid == job_id:
+                    return i + 1
+        return None
+
+    def estimated_wait(self, job_id: str) -> float | None:
+        """Seconds until job_id is expected to start, or None if not queued."""
+        pos = self.position(job_id)
+        if not pos:
+            return None
+        with self._cond:
+            return self._wait_for_position_locked(pos)
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that hasn't started yet. Returns True if it was removed."""
+        with self._cond:
+            for item in self._queue:
+                if item[0] == job_id:
+                    self._queue.remove(item)
+                    return True
+        return False
+
+    def is_full(self) -> bool:
+        with self._cond:
+            return len(self._queue) >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait before retrying."""
+        with self._cond:
+            return self._retry_after_locked()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "avg_job_seconds": round(self._avg_seconds, 1),
+            }
+
+    # ── Internals ──────────────────────────────────────────
+
+    def _wait_for_position_locked(self, pos: int) -> float:
+        now = time.time()
+        # Time left on the running jobs, assuming each takes the average
+        remaining = sorted(max(0.0, self._avg_seconds - (now - started)) for started in self._running.values())
+        remaining += [0.0] * (self.workers - len(remaining))
+        # Jobs ahead of us are handed out round-robin as workers free up
+        rounds = (pos - 1) // self.workers
+        slot = remaining[(pos - 1) % self.workers]
+        return slot + rounds * self._avg_seconds
+
+    def _retry_after_locked(self) -> int:
+        return max(1, math.ceil(self._wait_for_position_locked(1)))
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job_id, fn, args, kwargs = self._queue.popleft()
+                started = time.time()
+                self._running[job_id] = started
+
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Render job {job_id} crashed: {e}", exc_info=True)
+            finally:
+                elapsed = time.time() - started
+                with self._cond:
+                    self._running.pop(job_id, None)
+                    # Exponential moving average of job durations
+                    self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
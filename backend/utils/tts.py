@@ -4,8 +4,12 @@ Supports ElevenLabs (premium) and gTTS (free fallback) with multiple accents.
 """
 
 import os
+import re
+import time
+import random
 import requests
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +48,52 @@ GTTS_VOICES = [
 
 DEFAULT_VOICE = "rachel"
 
+# ── Narration Cache ────────────────────────────────────────
+# Regenerating a reel with the same script (e.g. to try another transition)
+# reuses the earlier audio instead of calling the TTS service again.
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "500"))
+_tts_cache = None
+
+
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))  # Parallel requests per narration
+# Requests in flight per engine across all renders in this process; ElevenLabs
+# plans allow only a few concurrent requests and answer 429 beyond that
+ENGINE_CONCURRENCY = {
+    "elevenlabs": int(os.getenv("ELEVENLABS_CONCURRENCY", "2")),
+    "gtts": TTS_CONCURRENCY,
+}
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "4"))
+TTS_RETRY_BASE_SECONDS = 1.0
+TTS_RETRY_MAX_SECONDS = 20.0
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+_engine_slots = {engine: threading.BoundedSemaphore(max(1, n)) for engine, n in ENGINE_CONCURRENCY.items()}
+
+
+class TTSRetryableError(Exception):
+    """A transient TTS failure (rate limit, server error); retry_after is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# Shared session so concurrent chunk requests reuse TLS connections
+_http = requests.Session()
+_http.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=TTS_CONCURRENCY))
+
+
+def _get_tts_cache():
+    global _tts_cache
+    if _tts_cache is None:
+        from utils.cache import FileCache
+        _tts_cache = FileCache("tts", TTS_CACHE_MAX_MB * 1024 * 1024, suffix=".mp3")
+    return _tts_cache
+
+
+def _tts_cache_key(text, engine, voice_id, model_id, stability, similarity_boost, speech_speed) -> str:
+    from utils.cache import hash_key
+    return hash_key(text, engine, voice_id, model_id, stability, similarity_boost, speech_speed)
+
 
 def get_gtts_voice(voice_id: str) -> dict | None:
     """Lookup a gTTS voice by its ID."""
@@ -91,22 +141,39 @@ def synthesize_speech(
 
     # Check if a gTTS voice was selected
     gtts_voice = get_gtts_voice(voice_id) if voice_id else None
+    cache = _get_tts_cache() if TTS_CACHE_MAX_MB > 0 else None
+    slow = speech_speed == "slow"
+
+    def render(engine, voice, synth, model=None, stab=None, sim=None):
+        params = (engine, voice, model, stab, sim, speech_speed)
+        key = _tts_cache_key(text, *params)
+        if cache and cache.fetch(key, output_path):
+            logger.info(f"[TTS cache] Hit for {engine} narration ({len(text)} chars)")
+            return output_path
+        _synthesize_chunked(text, output_path, synth, params, cache)
+        if cache:
+            cache.store(key, output_path)
+        return output_path
 
     # If voice is a gTTS voice, go straight to gTTS
     if gtts_voice:
         logger.info(f"Using gTTS voice: {gtts_voice['name']}")
-        return _gtts_tts(
-            text=text,
-            output_path=output_path,
-            lang=gtts_voice["lang"],
-            tld=gtts_voice["tld"],
-            slow=(speech_speed == "slow"),
+        lang, tld = gtts_voice["lang"], gtts_voice["tld"]
+        return render(
+            "gtts", f"{lang}:{tld}",
+            lambda chunk, path: _gtts_tts(text=chunk, output_path=path, lang=lang, tld=tld, slow=slow),
         )
 
     # Otherwise try ElevenLabs
     if api_key and api_key.strip():
+        key = api_key.strip()
+        el_voice = voice_id or ELEVENLABS_VOICES[DEFAULT_VOICE]
         try:
-            return _elevenlabs_tts(text, api_key.strip(), output_path, voice_id, model_id, stability, similarity_boost)
+            return render(
+                "elevenlabs", el_voice,
+                lambda chunk, path: _elevenlabs_tts(chunk, key, path, el_voice, model_id, stability, similarity_boost),
+                model_id, stability, similarity_boost,
+            )
         except Exception as e:
             error_msg = str(e)
             if "401" in error_msg:
@@ -117,7 +184,104 @@ def synthesize_speech(
                 logger.warning(f"ElevenLabs failed: {e}. Falling back to gTTS...")
 
     logger.info("Using Google TTS (free fallback)")
-    return _gtts_tts(text=text, output_path=output_path, slow=(speech_speed == "slow"))
+    return render("gtts", "en:com", lambda chunk, path: _gtts_tts(text=chunk, output_path=path, slow=slow))
+
+
+# ── Sentence Chunking ──────────────────────────────────────
+# Long scripts are synthesized one sentence per request, several at a time,
+# and the MP3 streams are joined back together. Sentence boundaries don't
+# move when other parts of the script are edited, so each sentence is also
+# cached on its own.
+
+def split_sentences(text: str) -> list:
+    """Split text into sentences, keeping terminal punctuation."""
+    return [s.strip() for s in _SENTENCE_END.split(text.strip()) if s.strip()]
+
+
+def _synthesize_chunked(text, output_path, synth, params, cache):
+    import shutil
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = params[0]
+    chunks = split_sentences(text)
+    if len(chunks) <= 1:
+        _synth_with_retries(engine, synth, text, output_path)
+        return
+
+    parts_dir = f"{os.path.splitext(output_path)[0]}_parts"
+    os.makedirs(parts_dir, exist_ok=True)
+
+    def synth_chunk(indexed):
+        i, chunk = indexed
+        part_path = os.path.join(parts_dir, f"part_{i:03d}.mp3")
+        key = _tts_cache_key(chunk, *params)
+        if cache and cache.fetch(key, part_path):
+            return part_path
+        _synth_with_retries(engine, synth, chunk, part_path)
+        if cache:
+            cache.store(key, part_path)
+        return part_path
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(TTS_CONCURRENCY, len(chunks))) as pool:
+            part_paths = list(pool.map(synth_chunk, enumerate(chunks)))
+        _concat_mp3(part_paths, output_path)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    logger.info(f"[TTS] Joined {len(chunks)} sentence chunks into {output_path}")
+
+
+def _synth_with_retries(engine: str, synth, text: str, path: str):
+    """
+    Run synth(text, path) within the engine's concurrency cap, retrying
+    transient failures with exponential backoff (or the server's Retry-After)
+    before the error reaches the caller's fallback.
+    """
+    slot = _engine_slots.get(engine)
+    for attempt in range(TTS_MAX_RETRIES + 1):
+        try:
+            if slot is None:
+                return synth(text, path)
+            with slot:
+                return synth(text, path)
+        except TTSRetryableError as e:
+            if attempt == TTS_MAX_RETRIES:
+                raise
+            delay = min(TTS_RETRY_MAX_SECONDS, e.retry_after or TTS_RETRY_BASE_SECONDS * 2 ** attempt)
+            delay *= random.uniform(1.0, 1.25)  # jitter so parallel chunks don't retry in lockstep
+            logger.warning(f"[TTS] {engine}: {e}; retry {attempt + 1}/{TTS_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _concat_mp3(part_paths: list, output_path: str):
+    """
+    Join MP3 parts into one MP3 by decoding and re-encoding them once.
+
+    Byte-level joining keeps each part's Xing/Info frame and its encoder
+    delay and padding, which play as gaps or clicks between sentences and
+    leave the first part's frame count in the header. FFmpeg's decoder trims
+    the delay and padding (gapless info) and the concat filter joins the
+    samples.
+    """
+    import subprocess
+
+    inputs = []
+    for path in part_paths:
+        inputs += ["-i", path]
+    n = len(part_paths)
+    graph = "".join(f"[{i}:a]" for i in range(n)) + f"concat=n={n}:v=0:a=1[out]"
+    tmp = f"{os.path.splitext(output_path)[0]}.joining.mp3"
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner"] + inputs + ["-filter_complex", graph, "-map", "[out]",
+                                                     "-c:a", "libmp3lame", "-b:a", "192k", tmp],
+        capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise Exception(f"Joining narration parts failed: {result.stderr[-300:]}")
+    os.replace(tmp, output_path)
 
 
 def _elevenlabs_tts(text, api_key, output_path, voice_id=None, model_id="eleven_monolingual_v1", stability=0.5, similarity_boost=0.75):
@@ -129,12 +293,20 @@ def _elevenlabs_tts(text, api_key, output_path, voice_id=None, model_id="eleven_
     payload = {"text": text, "model_id": model_id, "voice_settings": {"stability": stability, "similarity_boost": similarity_boost}}
 
     logger.info(f"[ElevenLabs] Synthesizing: '{text[:50]}...'")
-    response = requests.post(url, json=payload, headers=headers, timeout=60)
+    try:
+        response = _http.post(url, json=payload, headers=headers, timeout=60)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        raise TTSRetryableError(f"ElevenLabs request failed: {e}")
 
     if response.status_code == 401:
         raise Exception("ElevenLabs API key is invalid or expired (401).")
-    elif response.status_code == 429:
-        raise Exception("ElevenLabs rate limit exceeded (429).")
+    elif response.status_code == 429 or response.status_code >= 500:
+        try:
+            retry_after = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            retry_after = None
+        label = "rate limit exceeded" if response.status_code == 429 else "server error"
+        raise TTSRetryableError(f"ElevenLabs {label} ({response.status_code}).", retry_after)
     response.raise_for_status()
 
     with open(output_path, "wb") as f:
@@ -158,15 +330,3 @@ def _gtts_tts(text: str, output_path: str, lang: str = "en", tld: str = "com", s
     except Exception as e:
         logger.error(f"[gTTS] Failed: {e}")
         raise Exception(f"TTS failed: {e}")
-
-
-def get_audio_duration(audio_path: str) -> float:
-    import subprocess
-    try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", audio_path],
-            capture_output=True, text=True, timeout=10,
-        )
-        return float(result.stdout.strip())
-    except (subprocess.SubprocessError, ValueError):
-        return 5.0
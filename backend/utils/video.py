@@ -5,8 +5,15 @@ Supports 13+ professional transition types.
 """
 
 import os
+import math
+import shutil
 import subprocess
 import logging
+import threading
+
+from utils.ffmpeg import run_ffmpeg, FFmpegCancelled, temp_output_path
+from utils.media import probe_duration
+from utils.scheduler import RENDER_WORKERS
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +37,25 @@ TRANSITIONS = {
 # Backward compat mapping for old transition names
 _LEGACY_MAP = {"slide": "slideleft", "zoom": "zoomin"}
 
+# "single" renders the whole xfade chain in one FFmpeg graph; "segments" splits
+# it into independent pieces encoded in parallel and stream-copy concatenated.
+RENDER_MODE = os.getenv("RENDER_MODE", "single")
+
+# Draft render shown while the full-quality encode runs
+PREVIEW_SHORT_SIDE = 360
+PREVIEW_FPS = 15
+# FFmpeg processes per job for segments and clips. RENDER_WORKERS jobs run at
+# once, so the default splits the cores between them instead of giving each
+# job all of them.
+SEGMENT_WORKERS = int(os.getenv("SEGMENT_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // RENDER_WORKERS)
+
+# Per-image Ken Burns clips are cached (H.264, 2 s GOP) so re-renders of the
+# same photos only redo transitions, title and mux. A clip is a few MB, so the
+# default keeps on the order of a hundred jobs' worth. 0 disables the cache.
+CLIP_CACHE_MAX_MB = int(os.getenv("CLIP_CACHE_MAX_MB", "4096"))
+CLIP_CRF = 18
+CLIP_GOP_SECONDS = 2
+
 
 def get_ffmpeg_transition(transition_key: str) -> str:
     """Resolve a transition key to its FFmpeg xfade name."""
@@ -59,7 +85,42 @@ def create_reel(
     transition_duration: float = 0.5,
     title_text: str = "",
     title_position: str = "top",
+    render_mode: str = None,
+    on_progress=None,
+    variants: list = None,
+    preview_path: str = None,
+    on_preview=None,
+    cancel_event=None,
+    image_keys: list = None,
+    music_path: str = None,
+    music_volume: float = 0.15,
 ) -> str:
+    """
+    Render a reel from images and a narration track, optionally with music.
+
+    If music_path is given it is looped under the narration at music_volume,
+    faded out and ducked, all inside the render's own filter graph (see
+    utils.audio.music_mix_filter). Music that is missing or unreadable is
+    skipped with a warning and the reel keeps the narration only.
+
+    on_progress, if given, is called as on_progress(fraction, speed, eta_seconds)
+    while FFmpeg encodes (see utils.ffmpeg.run_ffmpeg).
+
+    variants is an optional list of extra outputs, each a dict with "path",
+    "resolution" and "max_duration". Variants at a different resolution are
+    split off the main filter graph and encoded in the same FFmpeg run;
+    variants at the reel's own resolution are linked or trimmed with stream
+    copy afterwards. A failed variant is logged and skipped.
+
+    If preview_path is given, a quick low-resolution draft is rendered there
+    first and on_preview(preview_path) is called before the full-quality
+    encode starts. Setting cancel_event stops any running encode and raises
+    FFmpegCancelled.
+
+    image_keys are content hashes of the images (hashed here if omitted),
+    used to look up cached Ken Burns clips. When every clip is cached the
+    reel is assembled from them directly and no preview is rendered.
+    """
     if not image_paths:
         raise ValueError("No images provided")
 
@@ -70,59 +131,233 @@ def create_reel(
     # Clamp transition duration
     transition_duration = max(0.3, min(1.5, transition_duration))
 
-    if duration_per_image is None and audio_path and os.path.exists(audio_path):
-        from utils.tts import get_audio_duration
-        total_audio = get_audio_duration(audio_path)
-        duration_per_image = max(total_audio / num_images, 1.5)
+    has_narration = bool(audio_path and os.path.exists(audio_path))
+    total_audio = None
+    if has_narration:
+        total_audio = probe_duration(audio_path)
+        if total_audio is None:
+            logger.warning(f"Could not determine narration duration for {audio_path}")
+
+    if duration_per_image is None and total_audio:
+        # The xfade chain lasts N*D - (N-1)*td and the mux cuts at the shortest
+        # stream, so D must cover the overlaps too; one extra frame absorbs the
+        # rounding of D*fps down to whole frames
+        # Segmented renders round each overlap up to whole frames; allow for that
+        overlaps = (num_images - 1) * math.ceil(transition_duration * fps) / fps
+        duration_per_image = max((total_audio + overlaps) / num_images + 1 / fps, 1.5)
     elif duration_per_image is None:
         duration_per_image = 3.0
 
+    music = None
+    if music_path and has_narration:
+        from utils.audio import music_is_usable
+        if music_is_usable(music_path):
+            music = {"path": music_path, "volume": max(0.0, min(1.0, music_volume)), "narration_duration": total_audio}
+        else:
+            logger.warning(f"Music file missing or unreadable: {music_path}, using narration only")
+
     # Ensure each image is longer than the transition
     duration_per_image = max(duration_per_image, transition_duration + 0.5)
 
+    # Resolve the ffmpeg transition name
+    ffmpeg_transition = get_ffmpeg_transition(transition)
+
+    work_dir = os.path.dirname(output_path)
+    clip_dir = os.path.join(work_dir, "clips")
+    clip_keys = clip_paths = None
+    if CLIP_CACHE_MAX_MB > 0:
+        try:
+            clip_keys = _clip_keys(image_paths, image_keys, resolution, fps, duration_per_image)
+            clip_paths = _fetch_clips(clip_keys, clip_dir)
+        except OSError as e:
+            logger.warning(f"Ken Burns clip cache unavailable: {e}")
+            clip_keys = clip_paths = None
+    missing = [i for i, p in enumerate(clip_paths) if p is None] if clip_paths else []
+
     logger.info(f"Creating reel: {num_images} images, {duration_per_image:.1f}s each, {width}x{height}, transition={transition} ({transition_duration}s)")
 
+    try:
+        stills = image_paths
+        if clip_paths is None or missing:
+            # Decode, rotate and shrink the uploads up front (in parallel) to the exact
+            # working size of the Ken Burns stage; the scale/crop below become no-ops.
+            from utils.images import prepare_images
+            stills = prepare_images(image_paths, (width * 2, height * 2), os.path.join(work_dir, "prep"))
+
+            if preview_path:
+                _render_preview(
+                    stills, audio_path, preview_path, duration_per_image, resolution,
+                    ffmpeg_transition, transition_duration, title_text, title_position, cancel_event, music,
+                )
+                if on_preview and os.path.exists(preview_path):
+                    on_preview(preview_path)
+        else:
+            logger.info(f"All {num_images} Ken Burns clips cached; skipping preview")
+
+        if missing:
+            try:
+                _render_clips(
+                    missing, stills, clip_keys, clip_paths, clip_dir, resolution, fps, duration_per_image,
+                    _progress_span(on_progress, 0.0, 0.7), cancel_event,
+                )
+                on_progress = _progress_span(on_progress, 0.7, 1.0)
+            except FFmpegCancelled:
+                raise
+            except Exception as e:
+                logger.warning(f"Ken Burns clip render failed ({e}); rendering from stills")
+                clip_paths = None
+
+        use_clips = clip_paths is not None
+        sources = clip_paths if use_clips else stills
+
+        def render(title):
+            return _render_reel(
+                sources, use_clips, stills, audio_path, output_path, duration_per_image, resolution, fps,
+                ffmpeg_transition, transition_duration, title, title_position, render_mode,
+                on_progress, variants, cancel_event, music,
+            )
+
+        try:
+            result = render(title_text)
+        except FFmpegCancelled:
+            raise
+        except Exception as e:
+            if not title_text:
+                raise
+            # drawtext can fail on its own (no freetype, missing font, odd characters);
+            # an untitled reel beats a failed job
+            logger.warning(f"Titled render failed ({e}); retrying without the title overlay")
+            result = render("")
+        _check_covers_narration(result, total_audio)
+        return result
+    finally:
+        shutil.rmtree(clip_dir, ignore_errors=True)
+        shutil.rmtree(os.path.join(work_dir, "prep"), ignore_errors=True)
+
+
+def _check_covers_narration(video_path: str, narration_duration: float | None):
+    """Warn if the reel came out shorter than its narration (the mux would have cut the voice)."""
+    if not narration_duration:
+        return
+    video_duration = probe_duration(video_path)
+    if video_duration is not None and video_duration < narration_duration - 0.1:
+        logger.warning(
+            f"Reel {os.path.basename(video_path)} is {video_duration:.2f}s but the narration is "
+            f"{narration_duration:.2f}s; the end of the narration was cut"
+        )
+
+
+def _render_reel(sources, use_clips, stills, audio_path, output_path, duration_per_image, resolution, fps,
+                 ffmpeg_transition, transition_duration, title_text, title_position, render_mode,
+                 on_progress, variants, cancel_event, music=None):
+    """Encode the reel from per-image sources: cached clips if use_clips, else stills."""
+    num_images = len(sources)
+    if (render_mode or RENDER_MODE) == "segments" and num_images > 1:
+        try:
+            _create_segmented_reel(
+                sources, audio_path, output_path, duration_per_image, resolution, fps,
+                ffmpeg_transition, transition_duration, title_text, title_position, on_progress, cancel_event,
+                use_clips, music,
+            )
+            _finish_variants(output_path, variants)
+            return output_path
+        except FFmpegCancelled:
+            raise
+        except FileNotFoundError:
+            raise Exception("FFmpeg is not installed. Please install FFmpeg and add it to your PATH.")
+        except Exception as e:
+            logger.warning(f"Segmented render failed ({e}); falling back to single-graph render")
+
+    # Variants at another resolution branch off the finished picture
+    scaled = [v for v in (variants or []) if tuple(v["resolution"]) != tuple(resolution)]
+    cmd, variant_audio_maps = _single_graph_command(
+        sources, audio_path, duration_per_image, resolution, fps,
+        ffmpeg_transition, transition_duration, title_text, title_position, scaled, use_clips, music,
+    )
+    partials = [temp_output_path(v["path"]) for v in scaled]
+    cmd += ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-c:a", "aac", "-b:a", "192k", "-pix_fmt", "yuv420p", "-movflags", "+faststart", output_path]
+    cmd += _variant_output_args(scaled, variant_audio_maps, partials)
+
+    total_duration = num_images * duration_per_image - (num_images - 1) * transition_duration
+
+    logger.info("Running FFmpeg...")
+    try:
+        result = run_ffmpeg(cmd, total_duration, on_progress, timeout=300, cancel_event=cancel_event)
+        if result.returncode != 0:
+            logger.error(f"FFmpeg error: {result.stderr}")
+            _discard_partials(partials)
+            _create_simple_reel(stills, audio_path, output_path, duration_per_image, resolution, fps, title_text, title_position, on_progress, cancel_event, music)
+            _finish_variants(output_path, variants)
+            return output_path
+
+        for v, partial in zip(scaled, partials):
+            os.replace(partial, v["path"])
+        _finish_variants(output_path, [v for v in (variants or []) if v not in scaled])
+
+        if title_text:
+            logger.info(f"Title overlay burned in: '{title_text}' at {title_position}")
+        logger.info(f"Reel created: {output_path} ({os.path.getsize(output_path)/1024/1024:.1f} MB)")
+        return output_path
+    except subprocess.TimeoutExpired:
+        raise Exception("Video generation timed out.")
+    except FileNotFoundError:
+        raise Exception("FFmpeg is not installed. Please install FFmpeg and add it to your PATH.")
+    finally:
+        _discard_partials(partials)
+
+
+def _render_preview(image_paths, audio_path, preview_path, duration_per_image, resolution,
+                    ffmpeg_transition, transition_duration, title_text, title_position, cancel_event=None, music=None):
+    """Fast low-res draft of the reel; failures are logged and leave no preview."""
+    width, height = resolution
+    scale = PREVIEW_SHORT_SIDE / min(width, height)
+    preview_res = (int(width * scale) // 2 * 2, int(height * scale) // 2 * 2)
+
+    cmd, _audio_maps = _single_graph_command(
+        image_paths, audio_path, duration_per_image, preview_res, PREVIEW_FPS,
+        ffmpeg_transition, transition_duration, title_text, title_position, music=music,
+    )
+    cmd += ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "30", "-c:a", "aac", "-b:a", "64k",
+            "-pix_fmt", "yuv420p", "-movflags", "+faststart", preview_path]
+    try:
+        result = run_ffmpeg(cmd, timeout=120, cancel_event=cancel_event)
+        if result.returncode != 0:
+            logger.warning(f"Preview render failed: {result.stderr[-300:]}")
+            return
+        logger.info(f"Preview ready: {preview_path} ({preview_res[0]}x{preview_res[1]} @ {PREVIEW_FPS}fps)")
+    except FFmpegCancelled:
+        raise
+    except Exception as e:
+        logger.warning(f"Preview render error: {e}")
+
+
+def _single_graph_command(image_paths, audio_path, duration_per_image, resolution, fps,
+                          ffmpeg_transition, transition_duration, title_text, title_position, scaled=(),
+                          use_clips=False, music=None):
+    """
+    FFmpeg inputs and filter graph rendering the whole xfade chain in one process.
+
+    image_paths are stills, or pre-rendered Ken Burns clips if use_clips.
+    Returns (cmd, variant_audio_maps): cmd ends with the main output's -map
+    arguments, ready for encoder options and the output path; the list
+    holds the audio -map arguments for each scaled variant.
+    """
+    num_images = len(image_paths)
     filter_parts = []
     input_args = []
 
     for i, img_path in enumerate(image_paths):
-        input_args.extend(["-loop", "1", "-t", str(duration_per_image), "-i", img_path])
-        direction = i % 4
-        zoom_start, zoom_end = 1.0, 1.08
-        dur_frames = int(duration_per_image * fps)
-
-        if direction == 0:
-            zoom_expr = f"{zoom_start}+({zoom_end}-{zoom_start})*on/{dur_frames}"
-            x_expr, y_expr = "iw/2-(iw/zoom/2)", "ih/2-(ih/zoom/2)"
-        elif direction == 1:
-            zoom_expr = f"{zoom_start}+({zoom_end}-{zoom_start})*on/{dur_frames}"
-            x_expr, y_expr = f"(iw-iw/zoom)*on/{dur_frames}", "ih/2-(ih/zoom/2)"
-        elif direction == 2:
-            zoom_expr = f"{zoom_end}-({zoom_end}-{zoom_start})*on/{dur_frames}"
-            x_expr, y_expr = "iw/2-(iw/zoom/2)", "ih/2-(ih/zoom/2)"
-        else:
-            zoom_expr = f"{zoom_start}+({zoom_end}-{zoom_start})*on/{dur_frames}"
-            x_expr, y_expr = "iw/2-(iw/zoom/2)", f"(ih-ih/zoom)*on/{dur_frames}"
-
-        filter_parts.append(
-            f"[{i}:v]scale={width*2}:{height*2}:force_original_aspect_ratio=increase,"
-            f"crop={width*2}:{height*2},"
-            f"zoompan=z='{zoom_expr}':x='{x_expr}':y='{y_expr}'"
-            f":d={dur_frames}:s={width}x{height}:fps={fps},"
-            f"setsar=1,format=yuva420p[v{i}]"
-        )
+        input_args.extend(_source_input(img_path, duration_per_image, use_clips))
+        filter_parts.append(f"[{i}:v]{_source_filter(i, resolution, fps, duration_per_image, use_clips)}[v{i}]")
 
-    if audio_path and os.path.exists(audio_path):
-        input_args.extend(["-i", audio_path])
-        audio_index = num_images
-    else:
-        audio_index = None
+    audio_inputs, audio_graph, audio_maps = _audio_inputs(audio_path, music, num_images, 1 + len(scaled))
+    input_args.extend(audio_inputs)
 
-    # Resolve the ffmpeg transition name
-    ffmpeg_transition = get_ffmpeg_transition(transition)
+    # Title is burned in the same graph so a titled reel still takes a single encode
+    title_filter = f",{_build_title_filter(title_text, title_position, resolution)}" if title_text else ""
 
     if num_images == 1:
-        filter_complex = f"{filter_parts[0]}; [v0]format=yuv420p[outv]"
+        filter_complex = f"{filter_parts[0]}; [v0]format=yuv420p{title_filter}[outv]"
     else:
         crossfade_parts = list(filter_parts)
         prev = "v0"
@@ -130,35 +365,415 @@ def create_reel(
             offset = max(i * duration_per_image - i * transition_duration, (i - 1) * 0.5 + 0.5)
             curr = f"v{i}"
             out = f"cf{i}" if i < num_images - 1 else "outv"
-            crossfade_parts.append(f"[{prev}][{curr}]xfade=transition={ffmpeg_transition}:duration={transition_duration}:offset={offset:.2f},format=yuv420p[{out}]")
+            tail = title_filter if out == "outv" else ""
+            crossfade_parts.append(f"[{prev}][{curr}]xfade=transition={ffmpeg_transition}:duration={transition_duration}:offset={offset:.2f},format=yuv420p{tail}[{out}]")
             prev = out if i < num_images - 1 else None
         filter_complex = "; ".join(crossfade_parts)
 
-    cmd = ["ffmpeg", "-y"] + input_args + ["-filter_complex", filter_complex, "-map", "[outv]"]
-    if audio_index is not None:
-        cmd += ["-map", f"{audio_index}:a", "-shortest"]
-    cmd += ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-c:a", "aac", "-b:a", "192k", "-pix_fmt", "yuv420p", "-movflags", "+faststart", output_path]
+    main_label = "outv"
+    if scaled:
+        filter_complex += "; " + _variant_split("[outv]", scaled, "main")
+        main_label = "main"
+
+    if audio_graph:
+        filter_complex += "; " + audio_graph
+    cmd = ["ffmpeg", "-y"] + input_args + ["-filter_complex", filter_complex, "-map", f"[{main_label}]"] + audio_maps[0]
+    return cmd, audio_maps[1:]
+
+
+def _audio_inputs(audio_path: str, music: dict, first_index: int, outputs: int = 1) -> tuple:
+    """
+    Input args, filter graph and per-output -map args for the reel's soundtrack.
+
+    The narration is input first_index. With music ({"path", "volume",
+    "narration_duration"}) the music is input first_index + 1, looped by the
+    demuxer, and the mix runs in the graph, split into one label per output.
+    Returns (input_args, graph, maps) with len(maps) == outputs.
+    """
+    if not (audio_path and os.path.exists(audio_path)):
+        return [], "", [[] for _ in range(outputs)]
+    inputs = ["-i", audio_path]
+    if not music:
+        return inputs, "", [["-map", f"{first_index}:a", "-shortest"] for _ in range(outputs)]
+
+    from utils.audio import music_mix_filter
+    inputs += ["-stream_loop", "-1", "-i", music["path"]]
+    labels = [f"[aout{k}]" for k in range(outputs)]
+    graph = music_mix_filter(
+        f"[{first_index}:a]", f"[{first_index + 1}:a]", music["narration_duration"], music["volume"],
+        labels[0] if outputs == 1 else "[amixed]",
+    )
+    if outputs > 1:
+        graph += f"; [amixed]asplit={outputs}{''.join(labels)}"
+    return inputs, graph, [["-map", label, "-shortest"] for label in labels]
+
+
+def _kenburns_filter(index: int, resolution: tuple, fps: int, duration_per_image: float) -> str:
+    """Scale/crop/zoompan chain for one image; the motion direction cycles with the index."""
+    width, height = resolution
+    direction = index % 4
+    zoom_start, zoom_end = 1.0, 1.08
+    dur_frames = int(duration_per_image * fps)
+
+    if direction == 0:
+        zoom_expr = f"{zoom_start}+({zoom_end}-{zoom_start})*on/{dur_frames}"
+        x_expr, y_expr = "iw/2-(iw/zoom/2)", "ih/2-(ih/zoom/2)"
+    elif direction == 1:
+        zoom_expr = f"{zoom_start}+({zoom_end}-{zoom_start})*on/{dur_frames}"
+        x_expr, y_expr = f"(iw-iw/zoom)*on/{dur_frames}", "ih/2-(ih/zoom/2)"
+    elif direction == 2:
+        zoom_expr = f"{zoom_end}-({zoom_end}-{zoom_start})*on/{dur_frames}"
+        x_expr, y_expr = "iw/2-(iw/zoom/2)", "ih/2-(ih/zoom/2)"
+    else:
+        zoom_expr = f"{zoom_start}+({zoom_end}-{zoom_start})*on/{dur_frames}"
+        x_expr, y_expr = "iw/2-(iw/zoom/2)", f"(ih-ih/zoom)*on/{dur_frames}"
+
+    return (
+        f"scale={width*2}:{height*2}:force_original_aspect_ratio=increase,"
+        f"crop={width*2}:{height*2},"
+        f"zoompan=z='{zoom_expr}':x='{x_expr}':y='{y_expr}'"
+        f":d={dur_frames}:s={width}x{height}:fps={fps},"
+        f"setsar=1,format=yuva420p"
+    )
+
+
+def _source_input(path: str, duration_per_image: float, use_clips: bool) -> list:
+    """FFmpeg input args for one image: a looped still, or its cached clip."""
+    if use_clips:
+        return ["-i", path]
+    return ["-loop", "1", "-t", str(duration_per_image), "-i", path]
+
+
+def _source_filter(index: int, resolution: tuple, fps: int, duration_per_image: float, use_clips: bool) -> str:
+    """Filter chain turning one input into its Ken Burns stream at resolution/fps."""
+    if use_clips:
+        width, height = resolution
+        return f"scale={width}:{height},fps={fps},setsar=1,format=yuva420p"
+    return _kenburns_filter(index, resolution, fps, duration_per_image)
+
+
+# ── Ken Burns clip cache ───────────────────────────────────
+# A clip depends only on the image content, output size, fps, its length in
+# frames and the motion direction, so it is cached under a hash of those and
+# reused across renders that change only the script, voice, music or title.
+
+_clip_cache = None
+_clip_cache_lock = threading.Lock()
+
+
+def _get_clip_cache():
+    global _clip_cache
+    with _clip_cache_lock:
+        if _clip_cache is None:
+            from utils.cache import FileCache
+            _clip_cache = FileCache("clips", CLIP_CACHE_MAX_MB * 1024 * 1024, suffix=".mp4")
+        return _clip_cache
+
+
+def _clip_keys(image_paths, image_keys, resolution, fps, duration_per_image) -> list:
+    from utils.cache import hash_key
+    if not image_keys or len(image_keys) != len(image_paths):
+        image_keys = [_file_digest(p) for p in image_paths]
+    clip_frames = int(duration_per_image * fps)
+    return [
+        hash_key("kenburns-v2", key, tuple(resolution), fps, clip_frames, i % 4, CLIP_CRF)
+        for i, key in enumerate(image_keys)
+    ]
+
+
+def _file_digest(path: str) -> str:
+    import hashlib
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fetch_clips(clip_keys: list, clip_dir: str) -> list:
+    """Link cached clips into clip_dir; None marks a miss."""
+    cache = _get_clip_cache()
+    os.makedirs(clip_dir, exist_ok=True)
+    paths = []
+    for i, key in enumerate(clip_keys):
+        dest = os.path.join(clip_dir, f"clip_{i:03d}.mp4")
+        paths.append(dest if cache.fetch(key, dest) else None)
+    hits = sum(1 for p in paths if p)
+    if hits:
+        logger.info(f"Ken Burns clip cache: {hits}/{len(paths)} hit(s)")
+    return paths
+
+
+def _render_clips(indices, stills, clip_keys, clip_paths, clip_dir, resolution, fps, duration_per_image,
+                  on_progress=None, cancel_event=None):
+    """Encode the missing clips in parallel, store them in the cache and fill in clip_paths."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = _get_clip_cache()
+    clip_frames = int(duration_per_image * fps)
+    workers = max(1, min(SEGMENT_WORKERS, len(indices)))
+    threads = max(1, (os.cpu_count() or 2) // workers)
+    done = dict.fromkeys(indices, 0.0)
+    progress_lock = threading.Lock()
+
+    def render(i):
+        out_path = os.path.join(clip_dir, f"clip_{i:03d}.mp4")
+        cmd = (
+            ["ffmpeg", "-y", "-loop", "1", "-t", str(duration_per_image), "-i", stills[i],
+             "-filter_complex", f"[0:v]{_kenburns_filter(i, resolution, fps, duration_per_image)},format=yuv420p[outv]",
+             "-map", "[outv]", "-frames:v", str(clip_frames), "-an",
+             # Short GOP: segment trims decode at most CLIP_GOP_SECONDS before their start
+             "-c:v", "libx264", "-preset", "veryfast", "-crf", str(CLIP_CRF), "-g", str(fps * CLIP_GOP_SECONDS),
+             "-pix_fmt", "yuv420p", "-threads", str(threads), out_path]
+        )
+
+        def clip_progress(fraction, _speed, _eta):
+            with progress_lock:
+                done[i] = fraction
+                overall = sum(done.values()) / len(done)
+            on_progress(overall, None, None)
+
+        result = run_ffmpeg(cmd, clip_frames / fps, clip_progress if on_progress else None,
+                            timeout=300, cancel_event=cancel_event)
+        if result.returncode != 0:
+            raise Exception(f"Clip {i} encode failed: {result.stderr[-300:]}")
+        cache.store(clip_keys[i], out_path)
+        clip_paths[i] = out_path
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(render, indices))
+    logger.info(f"Rendered {len(indices)} Ken Burns clip(s) on {workers} processes")
+
+
+def _progress_span(on_progress, start: float, end: float):
+    """Map a 0..1 progress callback onto [start, end] of the caller's range."""
+    if on_progress is None:
+        return None
+    return lambda fraction, speed, eta: on_progress(start + (end - start) * fraction, speed, eta)
+
+
+# ── Segment-parallel rendering ─────────────────────────────
+# The xfade chain is split into independent pieces: the part of each image's
+# Ken Burns clip that no transition touches ("body"), and each transition
+# overlap ("xfade"). Every piece is encoded by its own FFmpeg process and the
+# results are joined losslessly with the concat demuxer.
+
+def _plan_segments(num_images: int, clip_frames: int, xfade_frames: int) -> list:
+    """
+    Split the reel timeline into segments, in playback order.
+
+    Clip i covers output frames [i*(F-X), i*(F-X)+F) where F is clip_frames
+    and X is xfade_frames. Each segment records which clip frames it needs
+    and the output frame it starts at.
+    """
+    step = clip_frames - xfade_frames
+    segments = []
+    for i in range(num_images):
+        if i > 0:
+            segments.append({
+                "kind": "xfade", "image": i, "start_frame": i * step,
+                "frames": xfade_frames,
+            })
+        head = xfade_frames if i > 0 else 0
+        tail = clip_frames - xfade_frames if i < num_images - 1 else clip_frames
+        if tail > head:
+            segments.append({
+                "kind": "body", "image": i, "start_frame": i * step + head,
+                "trim": (head, tail),
+            })
+    return segments
+
+
+def _segment_command(segment, image_paths, out_path, duration_per_image, resolution, fps,
+                     ffmpeg_transition, title_text, title_position, threads, use_clips=False) -> list:
+    i = segment["image"]
+    start_time = segment["start_frame"] / fps
+    clip_frames = int(duration_per_image * fps)
+
+    def clip_input(idx):
+        return _source_input(image_paths[idx], duration_per_image, use_clips)
+
+    def clip_filter(idx):
+        return _source_filter(idx, resolution, fps, duration_per_image, use_clips)
+
+    if segment["kind"] == "body":
+        a, b = segment["trim"]
+        inputs = clip_input(i)
+        graph = (
+            f"[0:v]{clip_filter(i)},"
+            f"trim=start_frame={a}:end_frame={b},setpts=PTS-STARTPTS,format=yuv420p"
+        )
+    else:
+        x = segment["frames"]
+        inputs = clip_input(i - 1) + clip_input(i)
+        graph = (
+            f"[0:v]{clip_filter(i - 1)},"
+            f"trim=start_frame={clip_frames - x}:end_frame={clip_frames},setpts=PTS-STARTPTS[a]; "
+            f"[1:v]{clip_filter(i)},"
+            f"trim=start_frame=0:end_frame={x},setpts=PTS-STARTPTS[b]; "
+            f"[a][b]xfade=transition={ffmpeg_transition}:duration={x / fps:.4f}:offset=0,format=yuv420p"
+        )
+
+    # The title only lives in the first 4 seconds of the reel
+    if title_text and start_time < 4:
+        graph += f",{_build_title_filter(title_text, title_position, resolution, start_time)}"
+
+    return (
+        ["ffmpeg", "-y"] + inputs
+        + ["-filter_complex", graph + "[outv]", "-map", "[outv]", "-an",
+           "-c:v", "libx264", "-preset", "medium", "-crf", "23", "-pix_fmt", "yuv420p",
+           "-r", str(fps), "-threads", str(threads), out_path]
+    )
+
+
+def _create_segmented_reel(image_paths, audio_path, output_path, duration_per_image, resolution, fps,
+                           ffmpeg_transition, transition_duration, title_text="", title_position="top",
+                           on_progress=None, cancel_event=None, use_clips=False, music=None):
+    from concurrent.futures import ThreadPoolExecutor
+
+    clip_frames = int(duration_per_image * fps)
+    xfade_frames = max(1, math.ceil(transition_duration * fps))
+    segments = _plan_segments(len(image_paths), clip_frames, xfade_frames)
+
+    seg_dir = os.path.join(os.path.dirname(output_path), "segments")
+    os.makedirs(seg_dir, exist_ok=True)
+    workers = max(1, min(SEGMENT_WORKERS, len(segments)))
+    threads = max(1, (os.cpu_count() or 2) // workers)
+
+    commands = []
+    for n, segment in enumerate(segments):
+        seg_path = os.path.join(seg_dir, f"seg_{n:03d}.mp4")
+        segment["path"] = seg_path
+        commands.append(_segment_command(
+            segment, image_paths, seg_path, duration_per_image, resolution, fps,
+            ffmpeg_transition, title_text, title_position, threads, use_clips,
+        ))
+
+    logger.info(f"Segmented render: {len(segments)} segments on {workers} processes")
+
+    # Combine per-segment progress into one figure for the whole reel
+    seg_seconds = [(s.get("frames") or s["trim"][1] - s["trim"][0]) / fps for s in segments]
+    total_seconds = sum(seg_seconds)
+    done_seconds = [0.0] * len(segments)
+    speeds = [0.0] * len(segments)
+    progress_lock = threading.Lock()
+
+    def run(indexed):
+        n, cmd = indexed
+
+        def segment_progress(fraction, speed, _eta):
+            with progress_lock:
+                done_seconds[n] = fraction * seg_seconds[n]
+                speeds[n] = speed if fraction < 1 and speed else 0.0
+                done = sum(done_seconds)
+                total_speed = sum(speeds)
+            eta = (total_seconds - done) / total_speed if total_speed else None
+            on_progress(done / total_seconds, total_speed or None, eta)
+
+        return run_ffmpeg(cmd, seg_seconds[n], segment_progress if on_progress else None, timeout=300, cancel_event=cancel_event)
 
-    logger.info("Running FFmpeg...")
     try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, enumerate(commands)))
+        for result in results:
+            if result.returncode != 0:
+                raise Exception(f"Segment encode failed: {result.stderr[-500:]}")
+
+        concat_file = os.path.join(seg_dir, "concat.txt")
+        with open(concat_file, "w") as f:
+            for segment in segments:
+                f.write(f"file '{segment['path'].replace(chr(92), '/')}'\n")
+
+        cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_file]
+        audio_inputs, audio_graph, audio_maps = _audio_inputs(audio_path, music, 1)
+        if audio_inputs:
+            cmd += audio_inputs
+            if audio_graph:
+                cmd += ["-filter_complex", audio_graph]
+            cmd += ["-map", "0:v"] + audio_maps[0] + ["-c:a", "aac", "-b:a", "192k"]
+        cmd += ["-c:v", "copy", "-movflags", "+faststart", output_path]
+
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
         if result.returncode != 0:
-            logger.error(f"FFmpeg error: {result.stderr}")
-            return _create_simple_reel(image_paths, audio_path, output_path, duration_per_image, resolution, fps)
+            raise Exception(f"Segment concat failed: {result.stderr[-500:]}")
+    finally:
+        shutil.rmtree(seg_dir, ignore_errors=True)
 
-        # Add title text overlay if provided
-        if title_text:
-            _add_title_overlay(output_path, title_text, title_position, resolution)
+    logger.info(f"Reel created (segmented): {output_path} ({os.path.getsize(output_path)/1024/1024:.1f} MB)")
+    return output_path
 
-        logger.info(f"Reel created: {output_path} ({os.path.getsize(output_path)/1024/1024:.1f} MB)")
-        return output_path
-    except subprocess.TimeoutExpired:
-        raise Exception("Video generation timed out.")
-    except FileNotFoundError:
-        raise Exception("FFmpeg is not installed. Please install FFmpeg and add it to your PATH.")
 
+# ── Platform variants ──────────────────────────────────────
 
-def _create_simple_reel(image_paths, audio_path, output_path, duration_per_image, resolution, fps):
+def _variant_split(source_label: str, scaled: list, main_label: str = None) -> str:
+    """split + scale/pad chains feeding one [pvN] label per variant (plus main_label if given)."""
+    labels = ([f"[{main_label}]"] if main_label else []) + [f"[sv{k}]" for k in range(len(scaled))]
+    parts = [f"{source_label}split={len(labels)}{''.join(labels)}"]
+    for k, v in enumerate(scaled):
+        w, h = v["resolution"]
+        parts.append(
+            f"[sv{k}]scale={w}:{h}:force_original_aspect_ratio=decrease,"
+            f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:black,setsar=1[pv{k}]"
+        )
+    return "; ".join(parts)
+
+
+def _variant_output_args(scaled: list, audio_maps: list, partials: list) -> list:
+    """Output args encoding each scaled variant into its temp file (see temp_output_path)."""
+    args = []
+    for k, v in enumerate(scaled):
+        args += ["-map", f"[pv{k}]"] + audio_maps[k] + [
+            "-t", str(v["max_duration"]),
+            "-c:v", "libx264", "-preset", "medium", "-crf", "23",
+            "-c:a", "aac", "-b:a", "192k", "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart", partials[k],
+        ]
+    return args
+
+
+def _discard_partials(partials: list):
+    for path in partials:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _finish_variants(source_path: str, variants: list):
+    """Produce variants from a finished reel: one shared decode for rescaled ones, stream copy for the rest."""
+    if not variants:
+        return
+    from utils.export import export_video, probe_video
+
+    info = probe_video(source_path)
+    source_res = (info["width"], info["height"]) if info else None
+    scaled = [v for v in variants if tuple(v["resolution"]) != source_res]
+
+    for v in variants:
+        if v in scaled:
+            continue
+        try:
+            export_video(source_path, v["path"], v["resolution"], v["max_duration"])
+        except Exception as e:
+            logger.warning(f"Variant {os.path.basename(v['path'])} failed: {e}")
+
+    if not scaled:
+        return
+    partials = [temp_output_path(v["path"]) for v in scaled]
+    cmd = ["ffmpeg", "-y", "-i", source_path, "-filter_complex", _variant_split("[0:v]", scaled)]
+    cmd += _variant_output_args(scaled, [["-map", "0:a?"]] * len(scaled), partials)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+        if result.returncode != 0:
+            raise Exception(result.stderr[-500:])
+        for v, partial in zip(scaled, partials):
+            os.replace(partial, v["path"])
+        logger.info(f"Encoded {len(scaled)} variant(s) from one decode")
+    except Exception as e:
+        logger.warning(f"Variant encode failed: {e}")
+    finally:
+        _discard_partials(partials)
+
+
+def _create_simple_reel(image_paths, audio_path, output_path, duration_per_image, resolution, fps, title_text="", title_position="top", on_progress=None, cancel_event=None, music=None):
     width, height = resolution
     concat_file = output_path.replace(".mp4", "_concat.txt")
     with open(concat_file, "w") as f:
@@ -167,13 +782,19 @@ def _create_simple_reel(image_paths, audio_path, output_path, duration_per_image
         f.write(f"file '{image_paths[-1].replace(chr(92), '/')}'\n")
 
     cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_file]
-    if audio_path and os.path.exists(audio_path):
-        cmd += ["-i", audio_path]
-    cmd += ["-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black,format=yuv420p",
-            "-c:v", "libx264", "-preset", "medium", "-crf", "23", "-c:a", "aac", "-b:a", "192k",
+    audio_inputs, audio_graph, audio_maps = _audio_inputs(audio_path, music, 1)
+    cmd += audio_inputs
+    vf = f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black,format=yuv420p"
+    if title_text:
+        vf += f",{_build_title_filter(title_text, title_position, resolution)}"
+    if audio_graph:
+        cmd += ["-filter_complex", f"[0:v]{vf}[outv]; {audio_graph}", "-map", "[outv]"] + audio_maps[0]
+    else:
+        cmd += ["-vf", vf]
+    cmd += ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-c:a", "aac", "-b:a", "192k",
             "-shortest", "-pix_fmt", "yuv420p", "-movflags", "+faststart", output_path]
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+        result = run_ffmpeg(cmd, duration_per_image * len(image_paths), on_progress, timeout=300, cancel_event=cancel_event)
         if result.returncode != 0:
             raise Exception(f"FFmpeg error: {result.stderr[:500]}")
         return output_path
@@ -192,10 +813,15 @@ def create_thumbnail(video_path: str, output_path: str) -> str:
         return None
 
 
-def _add_title_overlay(video_path: str, title_text: str, position: str, resolution: tuple):
-    """Burn a title text overlay onto the first 4 seconds of the video."""
+def _build_title_filter(title_text: str, position: str, resolution: tuple, start_time: float = 0.0) -> str:
+    """
+    Build a drawtext filter showing the title for the first 4 seconds with fade in/out.
+
+    start_time is where the filtered stream begins on the reel timeline, so a
+    segment that starts mid-title picks up the fade at the right point.
+    """
     width, height = resolution
-    temp_path = video_path.replace(".mp4", "_titled.mp4")
+    t = f"(t+{start_time:.4f})" if start_time else "t"
 
     # Escape special characters for FFmpeg drawtext
     safe_text = title_text.replace("'", "\\'").replace(":", "\\:")
@@ -213,36 +839,12 @@ def _add_title_overlay(video_path: str, title_text: str, position: str, resoluti
 
     font_size = max(32, int(width * 0.04))
 
-    # Show title for first 4 seconds with fade in/out
-    drawtext = (
+    return (
         f"drawtext=text='{safe_text}'"
         f":fontsize={font_size}"
         f":fontcolor=white"
         f":borderw=3:bordercolor=black@0.6"
         f":x={x_expr}:y={y_expr}"
-        f":enable='between(t,0,4)'"
-        f":alpha='if(lt(t,0.5),t/0.5,if(gt(t,3.5),(4-t)/0.5,1))'"
+        f":enable='between({t},0,4)'"
+        f":alpha='if(lt({t},0.5),{t}/0.5,if(gt({t},3.5),(4-{t})/0.5,1))'"
     )
-
-    cmd = [
-        "ffmpeg", "-y", "-i", video_path,
-        "-vf", drawtext,
-        "-c:v", "libx264", "-preset", "fast", "-crf", "23",
-        "-c:a", "copy",
-        "-movflags", "+faststart",
-        temp_path,
-    ]
-
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode == 0:
-            os.replace(temp_path, video_path)
-            logger.info(f"Title overlay added: '{title_text}' at {position}")
-        else:
-            logger.warning(f"Title overlay failed: {result.stderr[:200]}")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-    except Exception as e:
-        logger.warning(f"Title overlay error: {e}")
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
@@ -0,0 +1,85 @@
+"""
+Vidgo.AI - Standalone Render Worker
+Pulls render jobs from the durable job queue and runs the TTS → mix →
+create_reel → create_thumbnail pipeline outside the web process.
+
+Usage (from the backend directory):
+    RENDER_BACKEND=queue JOB_STORE=sqlite python app.py   # web tier only enqueues
+    JOB_STORE=sqlite python -m worker --concurrency 2      # one or more workers
+
+Workers on other machines need the same output directory (VIDGO_OUTPUT_DIR)
+and job store/queue; use JOB_QUEUE=redis when they don't share a disk.
+"""
+
+import os
+import socket
+import logging
+import argparse
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+from utils.jobstore import create_job_store  # noqa: E402
+from utils.jobqueue import create_job_queue  # noqa: E402
+from utils.pipeline import run_render_job  # noqa: E402
+from utils.scheduler import RENDER_WORKERS  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_FOLDER = os.getenv("VIDGO_OUTPUT_DIR") or os.path.join(BASE_DIR, "output")
+MUSIC_FOLDER = os.path.join(BASE_DIR, "static", "music")
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger("worker")
+
+
+def work_loop(worker_id: str, job_store, job_queue, stop: threading.Event):
+    while not stop.is_set():
+        claimed = job_queue.claim(worker_id, timeout=5)
+        if claimed is None:
+            continue
+        job_id, params = claimed
+        logger.info(f"[{worker_id}] Rendering job {job_id}")
+        try:
+            if job_store.get(job_id) is None:
+                logger.warning(f"[{worker_id}] Job {job_id} is unknown to the job store, skipping")
+                continue
+            run_render_job(job_store, job_id, params, OUTPUT_FOLDER, MUSIC_FOLDER)
+        finally:
+            job_queue.ack(job_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vidgo.AI render worker")
+    parser.add_argument("--concurrency", type=int, default=RENDER_WORKERS,
+                        help="Jobs rendered at once by this process (default: RENDER_WORKERS)")
+    args = parser.parse_args()
+
+    job_store = create_job_store()
+    if not job_store.shared:
+        logger.warning("JOB_STORE is not shared (set JOB_STORE=sqlite); the web tier won't see progress")
+    job_queue = create_job_queue()
+
+    stop = threading.Event()
+    host = socket.gethostname()
+    threads = []
+    for n in range(max(1, args.concurrency)):
+        worker_id = f"{host}-{os.getpid()}-{n}"
+        t = threading.Thread(target=work_loop, args=(worker_id, job_store, job_queue, stop), name=worker_id)
+        t.start()
+        threads.append(t)
+
+    logger.info(f"Render worker started: {len(threads)} slot(s), output={OUTPUT_FOLDER}")
+    try:
+        for t in threads:
+            t.join()
+    except KeyboardInterrupt:
+        logger.info("Stopping after current jobs...")
+        stop.set()
+        for t in threads:
+            t.join()
+
+
+if __name__ == "__main__":
+    main()